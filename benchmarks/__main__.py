@@ -0,0 +1,113 @@
+import datetime
+import json
+import logging
+import platform
+import subprocess
+import sys
+from argparse import ArgumentParser
+from typing import Any, Dict, List, Optional
+
+from api_scoring import serializers
+from benchmarks.load import (
+    CLIENT_IDS_SIZES,
+    CONCURRENCY,
+    DURATION,
+    SERVER_WORKERS,
+    run_load,
+)
+from benchmarks.micro import NUMBER, run_micro
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(_item) for _item in value.split(",") if _item]
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_summary(results: Dict[str, Any]) -> None:
+    for _item in results.get("micro", []):
+        print(
+            f"{_item['name']:<32} {_item['per_call_us']:>10.2f} us/call",
+            file=sys.stderr,
+        )
+    for _item in results.get("load", []):
+        _label = _item["scenario"]
+        if "client_ids" in _item:
+            _label += f"[{_item['client_ids']}]"
+        _latency = _item["latency_ms"]
+        _workers = _item.get("server_workers") or "-"
+        print(
+            f"{_label:<28} c={_item['concurrency']:<4} w={_workers:<4}"
+            f" {_item['throughput_rps']:>9.1f} rps"
+            f" p50={_latency['p50']:.2f}ms p99={_latency['p99']:.2f}ms"
+            f" errors={_item['errors']}",
+            file=sys.stderr,
+        )
+
+
+def main() -> None:
+    parser = ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--suite", choices=("all", "micro", "load"), default="all")
+    parser.add_argument("-o", "--output", action="store", default=None)
+    parser.add_argument("--number", action="store", type=int, default=NUMBER)
+    parser.add_argument("--duration", action="store", type=float, default=DURATION)
+    parser.add_argument(
+        "--concurrency", action="store", type=_int_list, default=list(CONCURRENCY)
+    )
+    parser.add_argument(
+        "--client-ids", action="store", type=_int_list, default=list(CLIENT_IDS_SIZES)
+    )
+    parser.add_argument(
+        "--server-workers", action="store", type=int, default=SERVER_WORKERS
+    )  # threads of the in-process server
+    parser.add_argument(
+        "--target", action="store", default=None
+    )  # host:port of a running server instead of the in-process one
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    _address = None
+    if args.target:
+        _host, _, _port = args.target.rpartition(":")
+        _address = (_host or "localhost", int(_port))
+
+    results: Dict[str, Any] = {
+        "meta": {
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "json_backend": serializers.BACKEND,
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+    }
+    if args.suite in ("all", "micro"):
+        results["micro"] = run_micro(args.number)
+    if args.suite in ("all", "load"):
+        results["load"] = run_load(
+            args.duration,
+            args.concurrency,
+            args.client_ids,
+            _address,
+            args.server_workers,
+        )
+
+    _print_summary(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+
+
+if __name__ == "__main__":
+    main()
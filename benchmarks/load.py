@@ -0,0 +1,204 @@
+import http.client
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from api_scoring.api import MainHTTPHandler, get_token
+from api_scoring.models import MethodRequest
+from api_scoring.server import ThreadPoolHTTPServer
+from api_scoring.store import MemoryStore, Store
+
+DURATION = 5.0
+CONCURRENCY = (1, 8, 32)
+# Fixed, so concurrency levels above it show queueing for a worker.
+SERVER_WORKERS = 8
+CLIENT_IDS_SIZES = (1, 10, 100, 1000)
+BODIES = 256
+CLIENTS = 10_000
+INTERESTS = ["cars", "pets", "travel", "hi-tech", "sport", "music", "books", "tv"]
+
+
+def memory_store(clients: int = CLIENTS) -> MemoryStore:
+    return MemoryStore(
+        {
+            i: [INTERESTS[i % len(INTERESTS)], INTERESTS[(i * 7) % len(INTERESTS)]]
+            for i in range(clients)
+        }
+    )
+
+
+def _signed(method: str, arguments: Dict[str, Any]) -> bytes:
+    _body = {
+        "account": "horns&hoofs",
+        "login": "h&f",
+        "method": method,
+        "token": "",
+        "arguments": arguments,
+    }
+    _body["token"] = get_token(MethodRequest(_body))
+    return json.dumps(_body).encode("utf-8")
+
+
+def online_score_bodies(count: int = BODIES, seed: int = 0) -> List[bytes]:
+    # Distinct phones give distinct score keys, so the store is exercised too.
+    _random = random.Random(seed)
+    return [
+        _signed(
+            "online_score",
+            {
+                "phone": f"7{_random.randrange(10**10):010d}",
+                "email": "stupnikov@otus.ru",
+                "birthday": "01.01.1990",
+                "gender": 1,
+            },
+        )
+        for _ in range(count)
+    ]
+
+
+def clients_interests_bodies(
+    size: int, count: int = BODIES, seed: int = 0
+) -> List[bytes]:
+    _random = random.Random(seed)
+    return [
+        _signed(
+            "clients_interests",
+            {"client_ids": _random.sample(range(CLIENTS), size), "date": "20.07.2017"},
+        )
+        for _ in range(count)
+    ]
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def _client(
+    address: Tuple[str, int],
+    bodies: List[bytes],
+    deadline: float,
+    offset: int,
+    latencies: List[float],
+    errors: List[int],
+) -> None:
+    _conn = http.client.HTTPConnection(*address)
+    _headers = {"Content-Type": "application/json"}
+    i = offset
+    try:
+        while time.perf_counter() < deadline:
+            _body = bodies[i % len(bodies)]
+            i += 1
+            _start = time.perf_counter()
+            _conn.request("POST", "/method", _body, _headers)
+            _response = _conn.getresponse()
+            _response.read()
+            latencies.append(time.perf_counter() - _start)
+            if _response.status != 200:
+                errors.append(_response.status)
+    finally:
+        _conn.close()
+
+
+def drive(
+    address: Tuple[str, int], bodies: List[bytes], concurrency: int, duration: float
+) -> Dict[str, Any]:
+    """Send bodies from concurrency keep-alive clients for duration seconds."""
+    _latencies: List[List[float]] = [[] for _ in range(concurrency)]
+    _errors: List[int] = []
+    _deadline = time.perf_counter() + duration
+    _threads = [
+        threading.Thread(
+            target=_client,
+            args=(address, bodies, _deadline, i * 7, _latencies[i], _errors),
+        )
+        for i in range(concurrency)
+    ]
+    _start = time.perf_counter()
+    for _thread in _threads:
+        _thread.start()
+    for _thread in _threads:
+        _thread.join()
+    _elapsed = time.perf_counter() - _start
+    _all = sorted(_latency for _client in _latencies for _latency in _client)
+    return {
+        "concurrency": concurrency,
+        "duration_s": _elapsed,
+        "requests": len(_all),
+        "errors": len(_errors),
+        "throughput_rps": len(_all) / _elapsed if _elapsed else 0.0,
+        "latency_ms": {
+            "mean": sum(_all) / len(_all) * 1000 if _all else 0.0,
+            "p50": percentile(_all, 0.50) * 1000,
+            "p99": percentile(_all, 0.99) * 1000,
+            "max": _all[-1] * 1000 if _all else 0.0,
+        },
+    }
+
+
+@contextmanager
+def local_server(workers: int, store: Store) -> Iterator[Tuple[str, int]]:
+    _handler = type("BenchHTTPHandler", (MainHTTPHandler,), {"store": store})
+    _server = ThreadPoolHTTPServer(("localhost", 0), _handler, workers=workers)
+    _thread = threading.Thread(target=_server.serve_forever, daemon=True)
+    _thread.start()
+    try:
+        yield "localhost", _server.server_address[1]
+    finally:
+        _server.shutdown()
+        _server.server_close()
+
+
+def scenarios(
+    client_ids_sizes: Sequence[int] = CLIENT_IDS_SIZES,
+) -> List[Tuple[str, Dict[str, Any], List[bytes]]]:
+    _scenarios: List[Tuple[str, Dict[str, Any], List[bytes]]] = [
+        ("online_score", {}, online_score_bodies())
+    ]
+    for size in client_ids_sizes:
+        _scenarios.append(
+            ("clients_interests", {"client_ids": size}, clients_interests_bodies(size))
+        )
+    return _scenarios
+
+
+def run_load(
+    duration: float = DURATION,
+    concurrency: Sequence[int] = CONCURRENCY,
+    client_ids_sizes: Sequence[int] = CLIENT_IDS_SIZES,
+    address: Optional[Tuple[str, int]] = None,
+    server_workers: int = SERVER_WORKERS,
+) -> List[Dict[str, Any]]:
+    """Run every scenario at every concurrency level.
+
+    Without an address the handler is served in-process over a MemoryStore
+    by server_workers threads; clients and server then share one interpreter,
+    so compare the numbers between versions rather than reading them as
+    capacity.
+    """
+    _results = []
+    _scenarios = scenarios(client_ids_sizes)
+    _workers = server_workers if address is None else None
+    for _concurrency in concurrency:
+        with _target(address, server_workers) as _address:
+            for name, params, bodies in _scenarios:
+                _result = drive(_address, bodies, _concurrency, duration)
+                _results.append(
+                    {"scenario": name, **params, "server_workers": _workers, **_result}
+                )
+    return _results
+
+
+@contextmanager
+def _target(
+    address: Optional[Tuple[str, int]], workers: int
+) -> Iterator[Tuple[str, int]]:
+    if address is not None:
+        yield address
+        return
+    with local_server(workers, memory_store()) as _address:
+        yield _address
@@ -0,0 +1,80 @@
+import timeit
+from typing import Any, Callable, Dict, List, Tuple
+
+from api_scoring.api import get_token
+from api_scoring.models import (
+    ClientsInterestsRequest,
+    MethodRequest,
+    OnlineScoreRequest,
+)
+from api_scoring.scoring import configure_caches, get_key, get_score
+from api_scoring.store import MemoryStore, Store
+
+REPEAT = 5
+NUMBER = 10_000
+
+METHOD_BODY = {
+    "account": "horns&hoofs",
+    "login": "h&f",
+    "method": "online_score",
+    "token": "",
+    "arguments": {},
+}
+SCORE_ARGUMENTS = {
+    "phone": "79175002040",
+    "email": "stupnikov@otus.ru",
+    "first_name": "Stanislav",
+    "last_name": "Stupnikov",
+    "birthday": "01.01.1990",
+    "gender": 1,
+}
+INTERESTS_ARGUMENTS = {"client_ids": list(range(10)), "date": "20.07.2017"}
+
+
+def _cases(store: Store) -> List[Tuple[str, Callable[[], Any]]]:
+    _method = MethodRequest(METHOD_BODY)
+    _admin = MethodRequest(dict(METHOD_BODY, login="admin"))
+    _score = OnlineScoreRequest(SCORE_ARGUMENTS)
+    return [
+        ("validate_method_request", lambda: MethodRequest(METHOD_BODY)),
+        ("validate_online_score", lambda: OnlineScoreRequest(SCORE_ARGUMENTS)),
+        (
+            "validate_clients_interests",
+            lambda: ClientsInterestsRequest(INTERESTS_ARGUMENTS),
+        ),
+        ("get_token_user", lambda: get_token(_method)),
+        ("get_token_admin", lambda: get_token(_admin)),
+        ("get_key", lambda: get_key(_score)),
+        ("get_score_local_cache", lambda: get_score(_score, store)),
+    ]
+
+
+def _store_cases(store: Store) -> List[Tuple[str, Callable[[], Any]]]:
+    # Local caches are disabled, so every call goes to the store.
+    _score = OnlineScoreRequest(SCORE_ARGUMENTS)
+    return [("get_score_store", lambda: get_score(_score, store))]
+
+
+def _measure(name: str, func: Callable[[], Any], number: int) -> Dict[str, Any]:
+    _best = min(timeit.repeat(func, repeat=REPEAT, number=number))
+    return {
+        "name": name,
+        "number": number,
+        "repeat": REPEAT,
+        "best_s": _best,
+        "per_call_us": _best / number * 1e6,
+        "ops_per_s": number / _best if _best else 0.0,
+    }
+
+
+def run_micro(number: int = NUMBER) -> List[Dict[str, Any]]:
+    _results = []
+    _store = MemoryStore()
+    configure_caches()
+    for name, func in _cases(_store):
+        _results.append(_measure(name, func, number))
+    configure_caches(score_size=0, interests_size=0)
+    for name, func in _store_cases(_store):
+        _results.append(_measure(name, func, number))
+    configure_caches()
+    return _results
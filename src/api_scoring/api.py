@@ -1,36 +1,111 @@
 # #!/usr/bin/env python
 # # -*- coding: utf-8 -*-
 
+import asyncio
 import datetime
 import hashlib
+import hmac
 
 # import abc
-import json
 import logging
+import time
 import uuid
-from argparse import ArgumentParser
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from typing import Any
+from argparse import ArgumentParser, BooleanOptionalAction
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+from api_scoring import metrics, score_async, serializers, streaming
+from api_scoring.breaker import FAILURE_THRESHOLD, RESET_TIMEOUT
+from api_scoring.cache import (
+    INTERESTS_CACHE_SIZE,
+    INTERESTS_CACHE_TTL,
+    SCORE_CACHE_SIZE,
+    SCORE_CACHE_TTL,
+)
+from api_scoring.logs import access_log, access_sampled, setup_logging, stop_logging
 from api_scoring.models import (
+    MAX_CLIENT_IDS,
     ClientsInterestsRequest,
     MethodRequest,
     OnlineScoreRequest,
+    PayloadTooLarge,
+    configure_limits,
+    max_client_ids,
+)
+from api_scoring.replica import (
+    REPLICA_MAX_STALENESS,
+    REPLICA_REFRESH_INTERVAL,
+    InterestsReplica,
+    ReplicaStore,
+    configure_replica,
+)
+from api_scoring.score import (
+    INTERESTS_BATCH_SIZE,
+    POOL_IDLE_TIMEOUT,
+    POOL_SIZE,
+    POOL_TIMEOUT,
+    SOCKET_TIMEOUT,
+    TARANTOOL_HOST,
+    TARANTOOL_PORT,
+    configure_pool,
+)
+from api_scoring.score_async import close_connection, configure_async
+from api_scoring.scoring import (
+    configure_caches,
+    configure_interests,
+    get_interests,
+    get_interests_async,
+    get_interests_many,
+    get_score,
+    get_score_async,
+    get_scores,
+    stream_interests,
+)
+from api_scoring.server import (
+    KEEPALIVE_MAX_REQUESTS,
+    KEEPALIVE_TIMEOUT,
+    MAX_BODY_SIZE,
+    PREFORK,
+    PROCESS_WORKERS,
+    SERVER_MODES,
+    SINGLE,
+    THREAD_WORKERS,
+    THREADED,
+    ThreadPoolHTTPServer,
+    make_server,
+    serve_prefork,
+    serve_until_signal,
+)
+from api_scoring.server_async import ASYNC, serve_async
+from api_scoring.store import (
+    STORES,
+    TARANTOOL,
+    WRITE_BEHIND_MAX_PENDING,
+    Store,
+    build_store,
+    configure_store,
+    parse_address,
 )
-from api_scoring.scoring import get_interests, get_score
+from api_scoring.streaming import STREAM_THRESHOLD, LimitedReader, load_json_stream
 
 SALT = "Otus"
 ADMIN_SALT = "42"
+TOKEN_CACHE_SIZE = 10_000
 OK = 200
 BAD_REQUEST = 400
 FORBIDDEN = 403
 NOT_FOUND = 404
+REQUEST_ENTITY_TOO_LARGE = 413
 INVALID_REQUEST = 422
 INTERNAL_ERROR = 500
+NDJSON = "application/x-ndjson"
+STREAM_MIN_CLIENTS = 1000
 ERRORS = {
     BAD_REQUEST: "Bad Request",
     FORBIDDEN: "Forbidden",
     NOT_FOUND: "Not Found",
+    REQUEST_ENTITY_TOO_LARGE: "Request Entity Too Large",
     INVALID_REQUEST: "Invalid Request",
     INTERNAL_ERROR: "Internal Server Error",
 }
@@ -43,30 +118,71 @@ GENDERS = {
     FEMALE: "female",
 }
 
+_parse_timer = metrics.stage("parse")
+_validate_timer = metrics.stage("validate")
+_auth_timer = metrics.stage("auth")
+_serialize_timer = metrics.stage("serialize")
+
+
+class _AdminToken:
+    """Admin token of the current hour, recomputed on the hour boundary."""
+
+    def __init__(self) -> None:
+        self._state = (0.0, "")
+
+    def __call__(self) -> str:
+        _expires_at, _token = self._state
+        if time.time() >= _expires_at:
+            _hour = datetime.datetime.now().replace(minute=0, second=0, microsecond=0)
+            _token = hashlib.sha512(
+                (_hour.strftime("%Y%m%d%H") + ADMIN_SALT).encode("utf-8")
+            ).hexdigest()
+            _expires_at = (_hour + datetime.timedelta(hours=1)).timestamp()
+            self._state = (_expires_at, _token)
+        return _token
+
+
+admin_token = _AdminToken()
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _user_token(account: str, login: str) -> str:
+    return hashlib.sha512((account + login + SALT).encode("utf-8")).hexdigest()
+
 
 def get_token(request: MethodRequest) -> str:
     if request.is_admin:
-        return hashlib.sha512(
-            (datetime.datetime.now().strftime("%Y%m%d%H") + ADMIN_SALT).encode("utf-8")
-        ).hexdigest()
+        return admin_token()
     _acc = str(request.account) if request.account else ""
     _login = str(request.login) if request.login else ""
-    return hashlib.sha512((_acc + _login + SALT).encode("utf-8")).hexdigest()
+    return _user_token(_acc, _login)
 
 
 def check_auth(request: MethodRequest) -> bool:
-    return get_token(request) == request.token
+    return hmac.compare_digest(
+        get_token(request).encode("utf-8"), str(request.token).encode("utf-8")
+    )
 
 
-def method_handler(request: Any, ctx: Any, store: Any) -> tuple:
+def prepare_request(request: Any, ctx: Any) -> Any:
+    """Validate a method request.
+
+    Returns the validated arguments request to execute, or a ready
+    (response, code) tuple for errors and admin requests.
+    """
+    if not isinstance(request.get("body"), dict):
+        return "Method request must be a JSON object.", BAD_REQUEST
     try:
-        _method_request = MethodRequest(request.get("body"))
+        with _validate_timer.time():
+            _method_request = MethodRequest(request.get("body"))
     except ValueError as e:
         _message = str(e)
         logging.error(_message)
-        return json.dumps(_message), BAD_REQUEST
+        return _message, BAD_REQUEST
 
-    if not check_auth(_method_request):
+    with _auth_timer.time():
+        _authorized = check_auth(_method_request)
+    if not _authorized:
         logging.info("Invalid authentication.")
         return "", FORBIDDEN
 
@@ -74,19 +190,23 @@ def method_handler(request: Any, ctx: Any, store: Any) -> tuple:
 
     _online_score_requst, _clients_interests_request = None, None
     try:
-        if _arg_dict.get("client_ids", None) is None:
-            _online_score_requst = OnlineScoreRequest(_arg_dict)
-        else:
-            _clients_interests_request = ClientsInterestsRequest(_arg_dict)
+        with _validate_timer.time():
+            if _arg_dict.get("client_ids", None) is None:
+                _online_score_requst = OnlineScoreRequest(_arg_dict)
+            else:
+                _clients_interests_request = ClientsInterestsRequest(_arg_dict)
+    except PayloadTooLarge as e:
+        _message = str(e)
+        logging.error(_message)
+        return _message, REQUEST_ENTITY_TOO_LARGE
     except ValueError as e:
         _message = str(e)
         logging.error(_message)
-        return json.dumps(_message), BAD_REQUEST
+        return _message, BAD_REQUEST
 
     if _clients_interests_request:
         ctx["nclients"] = len(_clients_interests_request.client_ids)  # type: ignore
-        _responce, _code = get_interests(_clients_interests_request)
-        return _responce, _code
+        return _clients_interests_request
 
     if _online_score_requst:
         ctx["has"] = _online_score_requst.score
@@ -100,72 +220,433 @@ def method_handler(request: Any, ctx: Any, store: Any) -> tuple:
             )
         if _method_request.is_admin:
             return {"score": 42}, OK
-        else:
-            return {"score": get_score(_online_score_requst)}, OK
+        return _online_score_requst
     return "Unknown error", INTERNAL_ERROR
 
 
+def method_handler(request: Any, ctx: Any, store: Any) -> tuple:
+    _request = prepare_request(request, ctx)
+    if isinstance(_request, ClientsInterestsRequest):
+        _stream_from = ctx.get("stream_min_clients")
+        if _stream_from and len(_request.client_ids) >= _stream_from:  # type: ignore
+            return stream_interests(_request, store)
+        return get_interests(_request, store)
+    if isinstance(_request, OnlineScoreRequest):
+        return {"score": get_score(_request, store)}, OK
+    return _request
+
+
+async def method_handler_async(request: Any, ctx: Any, store: Any) -> tuple:
+    _request = prepare_request(request, ctx)
+    if isinstance(_request, ClientsInterestsRequest):
+        return await get_interests_async(_request)
+    if isinstance(_request, OnlineScoreRequest):
+        return {"score": await get_score_async(_request)}, OK
+    return _request
+
+
+def batch_handler(request: Any, ctx: Any, store: Any) -> tuple:
+    _items = request.get("body")
+    if not isinstance(_items, list):
+        return "Batch body must be a list of method requests.", BAD_REQUEST
+    ctx["nitems"] = len(_items)
+
+    _results: List[Any] = [None] * len(_items)
+    _scores: Dict[int, OnlineScoreRequest] = {}
+    _interests: Dict[int, ClientsInterestsRequest] = {}
+    for i, _item in enumerate(_items):
+        _request = prepare_request(
+            {"body": _item, "headers": request.get("headers")}, {}
+        )
+        if isinstance(_request, OnlineScoreRequest):
+            _scores[i] = _request
+        elif isinstance(_request, ClientsInterestsRequest):
+            _interests[i] = _request
+        else:
+            _results[i] = build_response(*_request)
+
+    if _scores:
+        for i, _score in zip(_scores, get_scores(list(_scores.values()), store)):
+            _results[i] = build_response({"score": _score}, OK)
+    if _interests:
+        for i, _result in zip(
+            _interests, get_interests_many(list(_interests.values()), store)
+        ):
+            _results[i] = build_response(*_result)
+    return _results, OK
+
+
+def build_response(response: Any, code: int) -> dict:
+    if code not in ERRORS:
+        return {"response": response, "code": code}
+    return {"error": response or ERRORS.get(code, "Unknown Error"), "code": code}
+
+
 class MainHTTPHandler(BaseHTTPRequestHandler):
-    router = {"method": method_handler}
-    store = None
+    router = {"method": method_handler, "batch": batch_handler}
+    # Passed to the route handlers, they fall back to get_store() without one.
+    store: Optional[Store] = None
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY the
+    # body waits for the client's delayed ACK on keep-alive connections.
+    disable_nagle_algorithm = True
+    timeout = KEEPALIVE_TIMEOUT
+    max_requests = KEEPALIVE_MAX_REQUESTS
+    max_body_size = MAX_BODY_SIZE
+    # clients_interests requests with at least this many ids are streamed.
+    stream_min_clients = STREAM_MIN_CLIENTS
+
+    def setup(self) -> None:
+        super().setup()
+        self.requests_served = 0
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if getattr(self, "_log_access", True):
+            access_log.info("%s - " + format, self.address_string(), *args)
 
     def get_request_id(self, headers):  # type: ignore
         return headers.get("HTTP_X_REQUEST_ID", uuid.uuid4().hex)
 
     def do_POST(self) -> None:
-        response, code = {}, OK
+        response: Any = {}
+        code = OK
         context = {"request_id": self.get_request_id(self.headers)}
+        self._log_access = access_sampled()
+        if self.stream_min_clients and self.request_version == "HTTP/1.1":
+            context["stream_min_clients"] = self.stream_min_clients
         request = None
+        data_string = b""
+        self._body_reader: Optional[LimitedReader] = None
         try:
-            data_string = self.rfile.read(int(self.headers["Content-Length"]))
-            request = json.loads(data_string.decode("utf8"))
-        except UnicodeDecodeError as e:
+            with _parse_timer.time():
+                request, data_string = self.read_body()
+        except PayloadTooLarge as e:
+            logging.error(e)
+            response, code = str(e), REQUEST_ENTITY_TOO_LARGE
+        except (TypeError, ValueError) as e:
             logging.exception(e)
             code = BAD_REQUEST
+        if code != OK and (self._body_reader is None or self._body_reader.remaining):
+            # The rest of the body was not read or can not be framed, so the
+            # connection is closed after the response.
+            self.close_connection = True
 
         if request:
             path = self.path.strip("/")
             _context = context["request_id"]
-            logging.info(f"{self.path}: {data_string!r} {_context}")
+            if self._log_access:
+                access_log.info("%s: %r %s", self.path, data_string, _context)
             if path in self.router:
                 try:
                     response, code = self.router[path](
                         {"body": request, "headers": self.headers}, context, self.store
                     )
                 except Exception as e:
-                    logging.exception(f"Unexpected error: {e}")
+                    logging.exception("Unexpected error: %s", e)
                     code = INTERNAL_ERROR
             else:
                 code = NOT_FOUND
 
+        # Unknown paths share one label so clients can not grow the series set.
+        _route = self.path.strip("/")
+        metrics.request_counter(_route if _route in self.router else "", code).inc()
+        self.send_json(code, response, context)
+        return
+
+    def send_json(self, code: int, response: Any, context: dict) -> None:
+        if isinstance(response, Iterator):
+            context.update(code=code, streamed=True)
+            if self._log_access:
+                access_log.info(context)
+            self.send_stream(code, response)
+            return
+        r = build_response(response, code)
+        context.update(r)
+        if self._log_access:
+            access_log.info(context)
+        with _serialize_timer.time():
+            _body = serializers.dumps(r)
+        self.send_body(code, _body, "application/json")
+
+    def read_body(self) -> Tuple[Any, bytes]:
+        """Parse the request body, returns it with the raw bytes if buffered.
+
+        Bodies over max_body_size are refused before reading. Large JSON
+        bodies are parsed incrementally when ijson is installed, stopping at
+        the first array longer than the clients ids limit.
+        """
+        _length = int(self.headers["Content-Length"])
+        if _length < 0:
+            raise ValueError(f"Invalid Content-Length: {_length}.")
+        if _length > self.max_body_size:
+            raise PayloadTooLarge(
+                f"Request body of {_length} bytes exceeds {self.max_body_size} bytes."
+            )
+        self._body_reader = _reader = LimitedReader(self.rfile, _length)
+        _ndjson = self.headers.get("Content-Type", "").startswith(NDJSON)
+        if streaming.ijson is not None and not _ndjson and _length > STREAM_THRESHOLD:
+            return load_json_stream(_reader, max_client_ids()), b""
+        data_string = _reader.read()
+        if _ndjson:
+            _lines = data_string.splitlines()
+            return [serializers.loads(_line) for _line in _lines if _line.strip()], (
+                data_string
+            )
+        return serializers.loads(data_string), data_string
+
+    def do_GET(self) -> None:
+        self._log_access = access_sampled()
+        if self.path.split("?", 1)[0].strip("/") != "metrics":
+            self.send_body(NOT_FOUND, b"", "text/plain")
+            return
+        self.send_body(
+            OK, metrics.registry.render().encode("utf-8"), metrics.CONTENT_TYPE
+        )
+
+    def closes_after_response(self) -> bool:
+        # A server without a thread pool handles one connection at a time, an
+        # idle keep-alive client there would block every other client. In the
+        # pool a connection gives its worker up once others wait for one.
+        if not isinstance(self.server, ThreadPoolHTTPServer):
+            return True
+        return (
+            self.close_connection
+            or self.requests_served >= self.max_requests
+            or self.server.has_queued()
+        )
+
+    def send_body(self, code: int, body: bytes, content_type: str) -> None:
+        self.requests_served += 1
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if self.closes_after_response():
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_stream(self, code: int, chunks: Iterator[dict]) -> None:
+        """Write the {"response": {...}, "code": ...} envelope with chunked
+        transfer encoding, one HTTP chunk per dict of entries."""
+        self.requests_served += 1
         self.send_response(code)
         self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        if self.closes_after_response():
+            self.send_header("Connection", "close")
         self.end_headers()
-        if code not in ERRORS:
-            r = {"response": response, "code": code}
-        else:
-            r = {"error": response or ERRORS.get(code, "Unknown Error"), "code": code}
-        context.update(r)
-        logging.info(context)
-        self.wfile.write(json.dumps(r).encode("utf-8"))
-        return
+        _prefix = b'{"response":{'
+        try:
+            for _chunk in chunks:
+                if not _chunk:
+                    continue
+                with _serialize_timer.time():
+                    _entries = serializers.dumps(_chunk)[1:-1]
+                self.write_chunk(_prefix + _entries)
+                _prefix = b","
+        except Exception as e:
+            # The status line is already sent; leaving the body without its
+            # last chunk tells the client the response is incomplete.
+            logging.exception("Streaming response failed: %s", e)
+            self.close_connection = True
+            return
+        _tail = b"" if _prefix == b"," else _prefix
+        self.write_chunk(_tail + b'},"code":%d}' % code)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def write_chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
 
 
 if __name__ == "__main__":
     parser = ArgumentParser()
     parser.add_argument("-p", "--port", action="store", type=int, default=8080)
     parser.add_argument("-l", "--log", action="store", default=None)
+    parser.add_argument("--log-json", action="store_true")
+    parser.add_argument("--log-queue", action=BooleanOptionalAction, default=True)
+    parser.add_argument(
+        "--access-log-sample-rate", action="store", type=float, default=1.0
+    )
+    parser.add_argument("--tarantool-host", action="store", default=TARANTOOL_HOST)
+    parser.add_argument(
+        "--tarantool-port", action="store", type=int, default=TARANTOOL_PORT
+    )
+    parser.add_argument("--store", action="store", choices=STORES, default=TARANTOOL)
+    parser.add_argument(
+        "--shard", action="append", type=parse_address, default=[]
+    )  # host:port of a tarantool shard, repeat for every instance
+    parser.add_argument("--write-behind", action=BooleanOptionalAction, default=True)
+    parser.add_argument(
+        "--write-behind-size",
+        action="store",
+        type=int,
+        default=WRITE_BEHIND_MAX_PENDING,
+    )
+    parser.add_argument(
+        "--score-function", action=BooleanOptionalAction, default=False
+    )  # get-or-set scores with the stored function in one round trip
+    parser.add_argument(
+        "--breaker-failures", action="store", type=int, default=FAILURE_THRESHOLD
+    )  # 0 disables the circuit breaker
+    parser.add_argument(
+        "--breaker-reset-timeout", action="store", type=float, default=RESET_TIMEOUT
+    )
+    parser.add_argument(
+        "--interests-replica", action=BooleanOptionalAction, default=False
+    )
+    parser.add_argument(
+        "--replica-refresh-interval",
+        action="store",
+        type=float,
+        default=REPLICA_REFRESH_INTERVAL,
+    )
+    parser.add_argument(
+        "--replica-max-staleness",
+        action="store",
+        type=float,
+        default=REPLICA_MAX_STALENESS,
+    )
+    parser.add_argument("--pool-size", action="store", type=int, default=POOL_SIZE)
+    parser.add_argument(
+        "--pool-timeout", action="store", type=float, default=POOL_TIMEOUT
+    )
+    parser.add_argument(
+        "--pool-idle-timeout", action="store", type=float, default=POOL_IDLE_TIMEOUT
+    )
+    parser.add_argument(
+        "--socket-timeout", action="store", type=float, default=SOCKET_TIMEOUT
+    )
+    parser.add_argument(
+        "--interests-batch-size",
+        action="store",
+        type=int,
+        default=INTERESTS_BATCH_SIZE,
+    )
+    parser.add_argument(
+        "--score-cache-size", action="store", type=int, default=SCORE_CACHE_SIZE
+    )
+    parser.add_argument(
+        "--score-cache-ttl", action="store", type=float, default=SCORE_CACHE_TTL
+    )
+    parser.add_argument(
+        "--interests-cache-size", action="store", type=int, default=INTERESTS_CACHE_SIZE
+    )
+    parser.add_argument(
+        "--interests-cache-ttl", action="store", type=float, default=INTERESTS_CACHE_TTL
+    )
+    parser.add_argument(
+        "--keepalive-timeout", action="store", type=float, default=KEEPALIVE_TIMEOUT
+    )
+    parser.add_argument(
+        "--keepalive-max-requests",
+        action="store",
+        type=int,
+        default=KEEPALIVE_MAX_REQUESTS,
+    )
+    parser.add_argument(
+        "--max-body-size", action="store", type=int, default=MAX_BODY_SIZE
+    )
+    parser.add_argument(
+        "--max-client-ids", action="store", type=int, default=MAX_CLIENT_IDS
+    )
+    parser.add_argument(
+        "--stream-min-clients", action="store", type=int, default=STREAM_MIN_CLIENTS
+    )  # 0 disables streamed interests responses
+    parser.add_argument(
+        "--json",
+        action="store",
+        choices=(serializers.AUTO,) + serializers.JSON_BACKENDS,
+        default=serializers.AUTO,
+    )
+    parser.add_argument(
+        "--mode", action="store", choices=SERVER_MODES + (ASYNC,), default=SINGLE
+    )
+    parser.add_argument(
+        "-w", "--workers", action="store", type=int, default=None
+    )  # threads in threaded mode, processes in prefork mode
+    parser.add_argument(
+        "--threads", action="store", type=int, default=None
+    )  # threads per process in prefork mode
     args = parser.parse_args()
-    logging.basicConfig(
+    if args.threads is not None and args.mode != PREFORK:
+        parser.error("--threads applies to --mode prefork, use -w for threads")
+    if args.mode == ASYNC and score_async.asynctnt is None:
+        parser.error("--mode async requires asynctnt: poetry install -E async")
+    setup_logging(
         filename=args.log,
-        level=logging.INFO,
-        format="[%(asctime)s] %(levelname).1s %(message)s",
-        datefmt="%Y.%m.%d %H:%M:%S",
+        json_format=args.log_json,
+        use_queue=args.log_queue,
+        access_sample_rate=args.access_log_sample_rate,
     )
-    server = HTTPServer(("localhost", args.port), MainHTTPHandler)
-    logging.info("Starting server at %s" % args.port)
-    try:
-        server.serve_forever()
-    except KeyboardInterrupt:
-        pass
-    server.server_close()
+    logging.info("Using %s JSON backend", serializers.select_backend(args.json))
+    _pool_options = dict(
+        size=args.pool_size,
+        timeout=args.pool_timeout,
+        idle_timeout=args.pool_idle_timeout,
+        socket_timeout=args.socket_timeout,
+    )
+    pool = configure_pool(
+        host=args.tarantool_host, port=args.tarantool_port, **_pool_options
+    )
+    store = build_store(
+        args.store,
+        args.shard,
+        write_behind=args.write_behind,
+        write_behind_size=args.write_behind_size,
+        breaker_failures=args.breaker_failures,
+        breaker_reset_timeout=args.breaker_reset_timeout,
+        score_function=args.score_function,
+        **_pool_options,
+    )
+    if args.interests_replica:
+        replica = InterestsReplica(
+            store, args.replica_refresh_interval, args.replica_max_staleness
+        )
+        # Loaded before workers are forked, they share the snapshot pages
+        # until their first refresh, after that each worker holds its own copy.
+        replica.refresh()
+        configure_replica(replica)
+        store = ReplicaStore(store, replica)
+    store = configure_store(store)
+    MainHTTPHandler.store = store
+    configure_interests(args.interests_batch_size)
+    configure_caches(
+        score_size=args.score_cache_size,
+        score_ttl=args.score_cache_ttl,
+        interests_size=args.interests_cache_size,
+        interests_ttl=args.interests_cache_ttl,
+    )
+    configure_async(
+        host=args.tarantool_host,
+        port=args.tarantool_port,
+        request_timeout=args.socket_timeout,
+    )
+    MainHTTPHandler.timeout = args.keepalive_timeout
+    MainHTTPHandler.max_requests = args.keepalive_max_requests
+    MainHTTPHandler.max_body_size = args.max_body_size
+    MainHTTPHandler.stream_min_clients = args.stream_min_clients
+    configure_limits(args.max_client_ids)
+    _address = ("localhost", args.port)
+    logging.info("Starting %s server at %s", args.mode, args.port)
+    if args.mode == ASYNC:
+        asyncio.run(
+            serve_async(
+                _address,
+                {"method": method_handler_async},
+                build_response,
+                keepalive_timeout=args.keepalive_timeout,
+                on_shutdown=close_connection,
+                max_body_size=args.max_body_size,
+            )
+        )
+    elif args.mode == PREFORK:
+        server = make_server(_address, MainHTTPHandler, threads=args.threads or 1)
+        serve_prefork(
+            server, processes=args.workers or PROCESS_WORKERS, on_exit=store.close
+        )
+    else:
+        _threads = (args.workers or THREAD_WORKERS) if args.mode == THREADED else 1
+        serve_until_signal(make_server(_address, MainHTTPHandler, threads=_threads))
+    store.close()
+    pool.close()
+    stop_logging()
@@ -0,0 +1,122 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from api_scoring import metrics
+from tarantool.error import NetworkError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 5.0
+
+
+class CircuitOpenError(NetworkError):
+    """Raised instead of calling a backend the breaker considers down."""
+
+
+class CircuitBreaker:
+    """Stops calling a failing backend for a while.
+
+    After failure_threshold consecutive NetworkErrors the breaker opens and
+    every call fails at once with CircuitOpenError. When reset_timeout has
+    passed one probe call is let through (half-open): success closes the
+    breaker, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str = "tarantool",
+        failure_threshold: int = FAILURE_THRESHOLD,
+        reset_timeout: float = RESET_TIMEOUT,
+    ):
+        if failure_threshold < 1:
+            raise ValueError("Failure threshold must be positive.")
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self._rejected = metrics.registry.counter(
+            "api_scoring_circuit_rejected_total",
+            "Calls rejected by an open circuit breaker.",
+            breaker=name,
+        )
+        _register_breaker(self)
+
+    def _allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = HALF_OPEN
+                logging.info("Circuit breaker %s is half-open.", self.name)
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def _success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self.state != CLOSED:
+                logging.info("Circuit breaker %s is closed.", self.name)
+                self.state = CLOSED
+
+    def _failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logging.error("Circuit breaker %s is open.", self.name)
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        if not self._allow():
+            self._rejected.inc()
+            raise CircuitOpenError(f"Circuit breaker {self.name} is open.")
+        try:
+            yield
+        except NetworkError:
+            self._failure()
+            raise
+        except BaseException:
+            # Not a backend outage, but a half-open probe must not stay taken.
+            with self._lock:
+                self._probing = False
+            raise
+        self._success()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def _register_breaker(breaker: CircuitBreaker) -> None:
+    _breakers[breaker.name] = breaker
+
+
+def _breaker_states() -> Dict[metrics.Labels, float]:
+    return {
+        (("breaker", _name),): STATES[_breaker.state]
+        for _name, _breaker in list(_breakers.items())
+    }
+
+
+metrics.registry.gauge(
+    "api_scoring_circuit_state",
+    "Circuit breaker state: 0 closed, 1 open, 2 half-open.",
+    _breaker_states,
+)
@@ -0,0 +1,195 @@
+import logging
+import sys
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from itertools import islice
+from typing import IO, Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from api_scoring import serializers
+from api_scoring.logs import setup_logging
+from api_scoring.models import OnlineScoreRequest
+from api_scoring.score import TARANTOOL_HOST, TARANTOOL_PORT, configure_pool
+from api_scoring.scoring import get_key
+from api_scoring.server import PROCESS_WORKERS
+from api_scoring.store import MEMORY, STORES, Store, build_store, parse_address
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+NONE = "none"
+CHUNK_SIZE = 10_000
+INVALID_ARGUMENTS = "Invalid arguments. Must be pass phone-email or first_name-last_name or gender-birthday"
+
+# Weights of compute_score: phone, email, birthday with gender, both names.
+SCORE_WEIGHTS = (1.5, 1.5, 1.5, 0.5)
+
+Columns = Tuple[List[bool], List[bool], List[bool], List[bool]]
+ChunkResult = Tuple[List[Tuple[str, float]], List[Tuple[int, str]]]
+
+
+def compute_scores(columns: Columns) -> List[float]:
+    """compute_score for a whole chunk, given one truth column per term."""
+    if numpy is not None:
+        _matrix = numpy.array(columns, dtype=numpy.float64)
+        return (numpy.array(SCORE_WEIGHTS) @ _matrix).tolist()
+    _phone, _email, _birthday_gender, _names = SCORE_WEIGHTS
+    return [
+        _phone * p + _email * e + _birthday_gender * bg + _names * n
+        for p, e, bg, n in zip(*columns)
+    ]
+
+
+def score_chunk(lines: List[Tuple[int, bytes]]) -> ChunkResult:
+    """Validate and score numbered JSONL lines, runs in a worker process."""
+    _keys: List[str] = []
+    _errors: List[Tuple[int, str]] = []
+    _columns: Columns = ([], [], [], [])
+    _phone, _email, _birthday_gender, _names = _columns
+    for _number, _line in lines:
+        try:
+            _arguments = serializers.loads(_line)
+            if not isinstance(_arguments, dict):
+                raise ValueError("Line must be a JSON object.")
+            _arguments = _arguments.get("arguments", _arguments)
+            if not isinstance(_arguments, dict):
+                raise ValueError("Arguments must be a JSON object.")
+            _request = OnlineScoreRequest(_arguments)
+        except (TypeError, ValueError) as e:
+            _errors.append((_number, str(e)))
+            continue
+        if _request.score == 0:
+            _errors.append((_number, INVALID_ARGUMENTS))
+            continue
+        _keys.append(get_key(_request))
+        _phone.append(bool(_request.phone))
+        _email.append(bool(_request.email))
+        _birthday_gender.append(bool(_request.birthday and _request.gender))
+        _names.append(bool(_request.first_name and _request.last_name))
+    return list(zip(_keys, compute_scores(_columns))), _errors
+
+
+def read_chunks(
+    lines: Iterable[bytes], chunk_size: int = CHUNK_SIZE
+) -> Iterator[List[Tuple[int, bytes]]]:
+    _numbered = ((i, _line) for i, _line in enumerate(lines, 1) if _line.strip())
+    while True:
+        _chunk = list(islice(_numbered, chunk_size))
+        if not _chunk:
+            return
+        yield _chunk
+
+
+class _InlineExecutor(Executor):
+    def submit(self, fn: Any, /, *args: Any, **kwargs: Any) -> Future:
+        _future: Future = Future()
+        try:
+            _future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            _future.set_exception(e)
+        return _future
+
+
+def score_lines(
+    lines: Iterable[bytes],
+    chunk_size: int = CHUNK_SIZE,
+    workers: int = PROCESS_WORKERS,
+) -> Iterator[ChunkResult]:
+    """Score chunks in a process pool, yielding results in input order.
+
+    At most two chunks per worker are in flight, so memory stays bounded
+    whatever the input size.
+    """
+    _executor: Executor = (
+        ProcessPoolExecutor(workers) if workers > 1 else _InlineExecutor()
+    )
+    _pending: Deque[Future] = deque()
+    with _executor:
+        for _chunk in read_chunks(lines, chunk_size):
+            _pending.append(_executor.submit(score_chunk, _chunk))
+            if len(_pending) >= max(workers, 1) * 2:
+                yield _pending.popleft().result()
+        while _pending:
+            yield _pending.popleft().result()
+
+
+def score_file(
+    source: IO[bytes],
+    output: Optional[IO[bytes]] = None,
+    store: Optional[Store] = None,
+    chunk_size: int = CHUNK_SIZE,
+    workers: int = PROCESS_WORKERS,
+) -> Dict[str, int]:
+    """Score a JSONL stream of online_score arguments.
+
+    Scores are bulk-loaded into store and written to output as
+    {"key", "score"} lines, invalid lines as {"line", "error"}.
+    """
+    _stats = {"scored": 0, "errors": 0}
+    for _rows, _errors in score_lines(source, chunk_size, workers):
+        if store is not None and _rows:
+            store.cache_set_many(_rows)
+        if output is not None:
+            output.writelines(
+                serializers.dumps({"key": key, "score": value}) + b"\n"
+                for key, value in _rows
+            )
+            output.writelines(
+                serializers.dumps({"line": _number, "error": _message}) + b"\n"
+                for _number, _message in _errors
+            )
+        _stats["scored"] += len(_rows)
+        _stats["errors"] += len(_errors)
+        for _number, _message in _errors:
+            logging.debug("Line %s: %s", _number, _message)
+    return _stats
+
+
+def main() -> None:
+    parser = ArgumentParser(prog="python -m api_scoring.bulk")
+    parser.add_argument("input", action="store")  # JSONL file, "-" for stdin
+    parser.add_argument("-o", "--output", action="store", default=None)
+    parser.add_argument(
+        "--store", action="store", choices=STORES + (NONE,), default=NONE
+    )
+    parser.add_argument("--tarantool-host", action="store", default=TARANTOOL_HOST)
+    parser.add_argument(
+        "--tarantool-port", action="store", type=int, default=TARANTOOL_PORT
+    )
+    parser.add_argument("--shard", action="append", type=parse_address, default=[])
+    parser.add_argument("--chunk-size", action="store", type=int, default=CHUNK_SIZE)
+    parser.add_argument(
+        "-w", "--workers", action="store", type=int, default=PROCESS_WORKERS
+    )
+    args = parser.parse_args()
+    setup_logging(use_queue=False)
+
+    store = None
+    if args.store != NONE:
+        configure_pool(host=args.tarantool_host, port=args.tarantool_port)
+        store = build_store(args.store, args.shard, write_behind=False)
+        if args.store == MEMORY:
+            logging.info("Memory store keeps scores only for the lifetime of the run.")
+
+    _source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    _output = open(args.output, "wb") if args.output else None
+    try:
+        _stats = score_file(_source, _output, store, args.chunk_size, args.workers)
+    finally:
+        _source.close()
+        if _output is not None:
+            _output.close()
+        if store is not None:
+            store.close()
+    logging.info(
+        "Scored %s lines, %s invalid (%s).",
+        _stats["scored"],
+        _stats["errors"],
+        "numpy" if numpy is not None else "pure python",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Tuple
+
+SCORE_CACHE_SIZE = 100_000
+SCORE_CACHE_TTL = 60.0
+INTERESTS_CACHE_SIZE = 100_000
+INTERESTS_CACHE_TTL = 60.0
+
+MISSING = object()
+
+
+class LRUCache:
+    """Bounded thread-safe LRU cache with a per-entry time to live."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        if maxsize < 0:
+            raise ValueError("Cache size can not be negative.")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _get(self, key: Hashable, now: float) -> Any:
+        # Caller holds the lock.
+        _item = self._data.get(key)
+        if _item is None:
+            self.misses += 1
+            return MISSING
+        if _item[0] <= now:
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return MISSING
+        self._data.move_to_end(key)
+        self.hits += 1
+        return _item[1]
+
+    def _set(self, key: Hashable, value: Any, expires_at: float) -> None:
+        # Caller holds the lock.
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        with self._lock:
+            _value = self._get(key, time.monotonic())
+        return default if _value is MISSING else _value
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        _found = {}
+        with self._lock:
+            _now = time.monotonic()
+            for key in keys:
+                _value = self._get(key, _now)
+                if _value is not MISSING:
+                    _found[key] = _value
+        return _found
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._set(key, value, time.monotonic() + self.ttl)
+
+    def set_many(self, items: Iterable[Tuple[Hashable, Any]]) -> None:
+        if not self.maxsize:
+            return
+        with self._lock:
+            _expires_at = time.monotonic() + self.ttl
+            for key, value in items:
+                self._set(key, value, _expires_at)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
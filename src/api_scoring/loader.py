@@ -0,0 +1,200 @@
+import csv
+import io
+import logging
+import sys
+import time
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import IO, Any, Deque, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from api_scoring import serializers
+from api_scoring.logs import setup_logging
+from api_scoring.score import (
+    SET_MANY_LUA,
+    TARANTOOL_HOST,
+    TARANTOOL_INTERESTS_SPACE,
+    TARANTOOL_PORT,
+    TARANTOOL_SCORE_SPACE,
+    ConnectionPool,
+)
+from api_scoring.store import HashRing, parse_address
+
+CSV = "csv"
+JSONL = "jsonl"
+FORMATS = (CSV, JSONL)
+SPACES = (TARANTOOL_SCORE_SPACE, TARANTOOL_INTERESTS_SPACE)
+LOAD_BATCH_SIZE = 1000
+LOAD_WORKERS = 4
+PROGRESS_INTERVAL = 5.0
+# Separates interests inside the second CSV column.
+INTERESTS_SEPARATOR = "|"
+CSV_HEADERS = ("key", "client_id")
+
+
+def parse_record(space: str, record: Any) -> List[Any]:
+    """Tuple for a space from a JSONL line or a CSV row."""
+    if isinstance(record, bytes):
+        record = serializers.loads(record)
+        if not isinstance(record, dict):
+            raise ValueError("Line must be a JSON object.")
+    if isinstance(record, dict):
+        if space == TARANTOOL_SCORE_SPACE:
+            return [str(record["key"]), float(record["score"])]
+        _key = record["client_id"] if "client_id" in record else record["key"]
+        _interests = record["interests"]
+        if not isinstance(_interests, list):
+            raise ValueError("Interests must be a list.")
+        return [int(_key), [str(_interest) for _interest in _interests]]
+    _key, _value = record
+    if space == TARANTOOL_SCORE_SPACE:
+        return [_key, float(_value)]
+    _interests = [
+        _interest for _interest in _value.split(INTERESTS_SEPARATOR) if _interest
+    ]
+    return [int(_key), _interests]
+
+
+def read_records(source: IO[bytes], fmt: str) -> Iterator[Any]:
+    if fmt == JSONL:
+        for _line in source:
+            if _line.strip():
+                yield _line
+        return
+    _rows = csv.reader(io.TextIOWrapper(source, encoding="utf-8", newline=""))
+    for i, _row in enumerate(_rows):
+        if not _row or (i == 0 and _row[0].strip().lower() in CSV_HEADERS):
+            continue
+        yield _row
+
+
+def read_tuples(
+    source: IO[bytes], space: str, fmt: str, stats: Dict[str, Any]
+) -> Iterator[List[Any]]:
+    """Parsed tuples, invalid records are counted in stats and skipped."""
+    for _number, _record in enumerate(read_records(source, fmt), 1):
+        try:
+            yield parse_record(space, _record)
+        except (KeyError, TypeError, ValueError) as e:
+            stats["errors"] += 1
+            logging.debug("Record %s: %r", _number, e)
+
+
+def _write_batch(pool: ConnectionPool, space: str, tuples: List[Any]) -> int:
+    with pool.connection() as conn:
+        conn.eval(SET_MANY_LUA, space, tuples)
+    return len(tuples)
+
+
+def load_tuples(
+    tuples: Iterable[List[Any]],
+    space: str,
+    pools: Sequence[ConnectionPool],
+    batch_size: int = LOAD_BATCH_SIZE,
+    workers: int = LOAD_WORKERS,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Replace tuples into a space in batches, from several connections.
+
+    Each batch is one transaction of replace calls, so loading the same data
+    again overwrites it instead of failing on existing keys. With several
+    pools tuples go to the shard the hash ring places their key on, the way
+    ShardedStore reads them. At most two batches per worker are in flight.
+    """
+    _stats: Dict[str, Any] = stats if stats is not None else {"errors": 0}
+    _stats["rows"] = 0
+    _ring = HashRing(len(pools)) if len(pools) > 1 else None
+    _pending: Deque[Future] = deque()
+    _started = _reported = time.monotonic()
+    _tuples = iter(tuples)
+    with ThreadPoolExecutor(workers) as _executor:
+        while True:
+            _batch = list(islice(_tuples, batch_size))
+            if not _batch:
+                break
+            _groups: Dict[int, List[Any]] = {}
+            for _tuple in _batch:
+                _node = _ring.node(_tuple[0]) if _ring is not None else 0
+                _groups.setdefault(_node, []).append(_tuple)
+            for _node, _group in _groups.items():
+                _pending.append(
+                    _executor.submit(_write_batch, pools[_node], space, _group)
+                )
+            while len(_pending) >= workers * 2:
+                _stats["rows"] += _pending.popleft().result()
+            if time.monotonic() - _reported >= PROGRESS_INTERVAL:
+                _reported = time.monotonic()
+                logging.info(
+                    "%s rows loaded, %.0f rows/s.",
+                    _stats["rows"],
+                    _stats["rows"] / (_reported - _started),
+                )
+        while _pending:
+            _stats["rows"] += _pending.popleft().result()
+    _stats["seconds"] = time.monotonic() - _started
+    _stats["rows_per_sec"] = (
+        _stats["rows"] / _stats["seconds"] if _stats["rows"] else 0.0
+    )
+    return _stats
+
+
+def load_file(
+    source: IO[bytes],
+    space: str,
+    fmt: str,
+    pools: Sequence[ConnectionPool],
+    batch_size: int = LOAD_BATCH_SIZE,
+    workers: int = LOAD_WORKERS,
+) -> Dict[str, Any]:
+    _stats: Dict[str, Any] = {"errors": 0}
+    _tuples = read_tuples(source, space, fmt, _stats)
+    return load_tuples(_tuples, space, pools, batch_size, workers, _stats)
+
+
+def main() -> None:
+    parser = ArgumentParser(prog="python -m api_scoring.loader")
+    parser.add_argument("space", action="store", choices=SPACES)
+    parser.add_argument("input", action="store")  # CSV or JSONL file, "-" for stdin
+    parser.add_argument("--format", action="store", choices=FORMATS, default=None)
+    parser.add_argument("--tarantool-host", action="store", default=TARANTOOL_HOST)
+    parser.add_argument(
+        "--tarantool-port", action="store", type=int, default=TARANTOOL_PORT
+    )
+    parser.add_argument("--shard", action="append", type=parse_address, default=[])
+    parser.add_argument(
+        "--batch-size", action="store", type=int, default=LOAD_BATCH_SIZE
+    )
+    parser.add_argument(
+        "-w", "--workers", action="store", type=int, default=LOAD_WORKERS
+    )
+    args = parser.parse_args()
+    setup_logging(use_queue=False)
+
+    _format = args.format or (CSV if args.input.endswith(".csv") else JSONL)
+    _addresses = args.shard or [(args.tarantool_host, args.tarantool_port)]
+    _pools = [
+        ConnectionPool(host=_host, port=_port, size=args.workers)
+        for _host, _port in _addresses
+    ]
+    _source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    try:
+        _stats = load_file(
+            _source, args.space, _format, _pools, args.batch_size, args.workers
+        )
+    finally:
+        _source.close()
+        for _pool in _pools:
+            _pool.close()
+    logging.info(
+        "Loaded %s rows into %s in %.1fs, %.0f rows/s, %s invalid records skipped.",
+        _stats["rows"],
+        args.space,
+        _stats["seconds"],
+        _stats["rows_per_sec"],
+        _stats["errors"],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+ACCESS_LOGGER = "api_scoring.access"
+LOG_FORMAT = "[%(asctime)s] %(levelname).1s %(message)s"
+LOG_DATE_FORMAT = "%Y.%m.%d %H:%M:%S"
+
+access_log = logging.getLogger(ACCESS_LOGGER)
+_access_sample_rate = 1.0
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, dict messages are merged in as fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        _payload: Dict[str, Any] = {
+            "time": self.formatTime(record, LOG_DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        if isinstance(record.msg, dict) and not record.args:
+            _payload.update(record.msg)
+        else:
+            _payload["message"] = record.getMessage()
+        if record.exc_info:
+            _payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(_payload, default=str, ensure_ascii=False)
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Dict messages (request contexts) are snapshotted instead of rendered,
+        # so JsonFormatter can still emit them as fields in the listener thread.
+        _msg = record.msg
+        if isinstance(_msg, dict) and not record.args:
+            record = logging.makeLogRecord(record.__dict__)
+            record.msg = dict(_msg)
+            return record
+        return super().prepare(record)
+
+
+def access_sampled() -> bool:
+    """Decide once per request whether its access log lines are written."""
+    if not access_log.isEnabledFor(logging.INFO):
+        return False
+    return _access_sample_rate >= 1.0 or random.random() < _access_sample_rate
+
+
+def _restart_listener_in_child() -> None:
+    # The listener thread does not survive fork, start a fresh one on a new queue.
+    global _listener
+    if _listener is None:
+        return
+    _queue: queue.SimpleQueue = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, _QueueHandler):
+            handler.queue = _queue
+    _listener = QueueListener(_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def setup_logging(
+    filename: Optional[str] = None,
+    level: int = logging.INFO,
+    json_format: bool = False,
+    use_queue: bool = True,
+    access_sample_rate: float = 1.0,
+) -> None:
+    """Configure the root logger.
+
+    With use_queue the request threads only put records on a queue and a
+    background listener formats and writes them.
+    """
+    global _listener, _access_sample_rate
+    _access_sample_rate = access_sample_rate
+    _handler: logging.Handler = (
+        logging.FileHandler(filename) if filename else logging.StreamHandler()
+    )
+    _handler.setFormatter(
+        JsonFormatter()
+        if json_format
+        else logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT)
+    )
+    _root = logging.getLogger()
+    _root.setLevel(level)
+    for handler in list(_root.handlers):
+        _root.removeHandler(handler)
+
+    if not use_queue:
+        _root.addHandler(_handler)
+        return
+    _queue: queue.SimpleQueue = queue.SimpleQueue()
+    _root.addHandler(_QueueHandler(_queue))
+    _listener = QueueListener(_queue, _handler, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Flush queued records, call before the process exits."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+os.register_at_fork(after_in_child=_restart_listener_in_child)
@@ -0,0 +1,247 @@
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[Tuple[str, str], ...]
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    _parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        _parts.append(extra)
+    return "{" + ",".join(_parts) + "}" if _parts else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Registry:
+    """Metrics registry with per-thread shards.
+
+    Every thread updates only its own shard, so the hot path takes no lock;
+    render() sums the shards of all threads.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[Dict[Any, List[float]]] = []
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._series: Dict[Tuple[str, Labels], Any] = {}
+        self._gauges: Dict[str, Callable[[], Dict[Labels, float]]] = {}
+
+    def _shard(self) -> Dict[Any, List[float]]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            _shard: Dict[Any, List[float]] = {}
+            with self._lock:
+                self._shards.append(_shard)
+            self._local.shard = _shard
+            return _shard
+
+    def _get_series(self, cls: type, name: str, help: str, labels: Labels) -> Any:
+        _key = (name, labels)
+        _series = self._series.get(_key)
+        if _series is None:
+            with self._lock:
+                _series = self._series.get(_key)
+                if _series is None:
+                    self._meta.setdefault(name, (cls.TYPE, help))  # type: ignore
+                    _series = self._series[_key] = cls(self, name, labels)
+        return _series
+
+    def counter(self, name: str, help: str = "", **labels: str) -> "Counter":
+        return self._get_series(Counter, name, help, tuple(sorted(labels.items())))
+
+    def histogram(self, name: str, help: str = "", **labels: str) -> "Histogram":
+        return self._get_series(Histogram, name, help, tuple(sorted(labels.items())))
+
+    def gauge(
+        self, name: str, help: str, collect: Callable[[], Dict[Labels, float]]
+    ) -> None:
+        """Register a callback read at render time, e.g. cache statistics."""
+        with self._lock:
+            self._meta[name] = ("gauge", help)
+            self._gauges[name] = collect
+
+    def _totals(self) -> Dict[Any, List[float]]:
+        with self._lock:
+            _shards = list(self._shards)
+        _totals: Dict[Any, List[float]] = {}
+        for _shard in _shards:
+            for _key, _values in list(_shard.items()):
+                _total = _totals.setdefault(_key, [0.0] * len(_values))
+                for i, _value in enumerate(list(_values)):
+                    _total[i] += _value
+        return _totals
+
+    def render(self) -> str:
+        _totals = self._totals()
+        with self._lock:
+            _series = list(self._series.values())
+            _meta = dict(self._meta)
+            _gauges = dict(self._gauges)
+        _lines: Dict[str, List[str]] = {name: [] for name in _meta}
+        for _item in _series:
+            _lines[_item.name].extend(_item.render(_totals.get(_item.key)))
+        for _name, _collect in _gauges.items():
+            for _labels, _value in _collect().items():
+                _lines[_name].append(
+                    f"{_name}{_format_labels(_labels)} {_format_value(_value)}"
+                )
+
+        _output = []
+        for _name, (_type, _help) in _meta.items():
+            _output.append(f"# HELP {_name} {_help}")
+            _output.append(f"# TYPE {_name} {_type}")
+            _output.extend(_lines[_name])
+        return "\n".join(_output) + "\n"
+
+
+class Counter:
+    TYPE = "counter"
+
+    def __init__(self, registry: Registry, name: str, labels: Labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.key = (name, labels)
+
+    def inc(self, value: float = 1.0) -> None:
+        _shard = self.registry._shard()
+        _values = _shard.get(self.key)
+        if _values is None:
+            _values = _shard[self.key] = [0.0]
+        _values[0] += value
+
+    def render(self, totals: Optional[List[float]]) -> List[str]:
+        _value = totals[0] if totals else 0.0
+        return [f"{self.name}{_format_labels(self.labels)} {_format_value(_value)}"]
+
+
+class Histogram:
+    TYPE = "histogram"
+
+    def __init__(
+        self,
+        registry: Registry,
+        name: str,
+        labels: Labels,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.key = (name, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float) -> None:
+        # Layout: one slot per bucket, +Inf, then sum and count.
+        _shard = self.registry._shard()
+        _values = _shard.get(self.key)
+        if _values is None:
+            _values = _shard[self.key] = [0.0] * (len(self.buckets) + 3)
+        _values[bisect_left(self.buckets, value)] += 1
+        _values[-2] += value
+        _values[-1] += 1
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+    def timed(self, func: F) -> F:
+        """Decorator observing the duration of every call, coroutines included."""
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def _async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with _Timer(self):
+                    return await func(*args, **kwargs)
+
+            return _async_wrapper  # type: ignore
+
+        @functools.wraps(func)
+        def _wrapper(*args: Any, **kwargs: Any) -> Any:
+            with _Timer(self):
+                return func(*args, **kwargs)
+
+        return _wrapper  # type: ignore
+
+    def render(self, totals: Optional[List[float]]) -> List[str]:
+        _values = totals or [0.0] * (len(self.buckets) + 3)
+        _lines = []
+        _cumulative = 0.0
+        for _bound, _count in zip(self.buckets + (float("inf"),), _values):
+            _cumulative += _count
+            _le = "+Inf" if _bound == float("inf") else repr(_bound)
+            _labels = _format_labels(self.labels, f'le="{_le}"')
+            _lines.append(f"{self.name}_bucket{_labels} {_format_value(_cumulative)}")
+        _labels = _format_labels(self.labels)
+        _lines.append(f"{self.name}_sum{_labels} {_format_value(_values[-2])}")
+        _lines.append(f"{self.name}_count{_labels} {_format_value(_values[-1])}")
+        return _lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+registry = Registry()
+
+STAGE_SECONDS = "api_scoring_stage_seconds"
+STAGE_HELP = "Time spent in each request processing stage."
+STORE_SECONDS = "api_scoring_store_seconds"
+STORE_HELP = "Time spent in tarantool requests."
+STORE_ERRORS_TOTAL = "api_scoring_store_errors_total"
+STORE_ERRORS_HELP = "Tarantool requests failed with a network error."
+REQUESTS_TOTAL = "api_scoring_requests_total"
+REQUESTS_HELP = "Processed HTTP requests."
+
+
+def stage(name: str) -> Histogram:
+    return registry.histogram(STAGE_SECONDS, STAGE_HELP, stage=name)
+
+
+def store_op(name: str) -> Histogram:
+    return registry.histogram(STORE_SECONDS, STORE_HELP, op=name)
+
+
+def request_counter(path: str, code: int) -> Counter:
+    return registry.counter(REQUESTS_TOTAL, REQUESTS_HELP, path=path, code=str(code))
+
+
+def store_error() -> Counter:
+    return registry.counter(STORE_ERRORS_TOTAL, STORE_ERRORS_HELP)
@@ -1,30 +1,168 @@
 import datetime
 import re
+import time
+from functools import lru_cache
 from typing import Any, Dict, List, Self, Type, Union
 
 ADMIN_LOGIN = "admin"
 EMAIL = r"[^@]+@[^@]+\.[^@]+"
+DATE_FORMAT = "%d.%m.%Y"
+DATE_CACHE_SIZE = 4096
+EMAIL_CACHE_SIZE = 4096
+MAX_CLIENT_IDS = 10_000
+EMAIL_RE = re.compile(EMAIL)
+
+_MISSING = object()
+
+
+class PayloadTooLarge(ValueError):
+    pass
+
+
+def parse_date(value: Any) -> datetime.datetime:
+    # Fast path for the canonical zero-padded form. Anything else, including
+    # invalid dates, goes through strptime so lenient inputs and error
+    # messages stay exactly the same.
+    if (
+        type(value) is str
+        and len(value) == 10
+        and value[2] == "."
+        and value[5] == "."
+        and value.isascii()
+    ):
+        _day, _month, _year = value[:2], value[3:5], value[6:]
+        if _day.isdigit() and _month.isdigit() and _year.isdigit():
+            try:
+                return datetime.datetime(int(_year), int(_month), int(_day))
+            except ValueError:
+                pass
+    return datetime.datetime.strptime(value, DATE_FORMAT)
+
+
+_parse_date_cached = lru_cache(maxsize=DATE_CACHE_SIZE)(parse_date)
+
+
+def parse_date_cached(value: Any) -> datetime.datetime:
+    if type(value) is str:
+        return _parse_date_cached(value)
+    return parse_date(value)
+
+
+@lru_cache(maxsize=EMAIL_CACHE_SIZE)
+def is_valid_email(value: str) -> bool:
+    if value.isascii():
+        # Same language as EMAIL: a non-empty local part before the first "@",
+        # then up to the next "@" a domain with a dot that is neither first
+        # nor last.
+        _local, _, _rest = value.partition("@")
+        _domain = _rest.partition("@")[0]
+        return bool(_local) and "." in _domain[1:-1]
+    return EMAIL_RE.match(value) is not None
+
+
+class _Midnight:
+    """Today's midnight as a naive datetime, recomputed once per day."""
+
+    def __init__(self) -> None:
+        self._value = datetime.datetime.min
+        self._expires_at = 0.0
+
+    def __call__(self) -> datetime.datetime:
+        if time.time() >= self._expires_at:
+            _value = datetime.datetime.combine(
+                datetime.date.today(), datetime.datetime.min.time()
+            )
+            self._value = _value
+            self._expires_at = (_value + datetime.timedelta(days=1)).timestamp()
+        return self._value
+
+
+today_midnight = _Midnight()
 
 
 class RequestORM(type):
     def __new__(
-        self: Type[type], name: str, bases: tuple, namespace: dict
+        self: Type[type],
+        name: str,
+        bases: tuple,
+        namespace: dict,
+        slots: bool = False,
+        compiled: bool = True,
     ) -> "RequestORM":
         required_attr: List[str] = []
         non_nullable_attr: List[str] = []
+        fields: Dict[str, Field] = {}
 
         for k, v in namespace.items():
             if isinstance(v, Field):
-                namespace[k] = v
+                fields[k] = v
                 if v.required:  # type: ignore
                     required_attr.append(k)
                 if not v.nullable:  # type: ignore
                     non_nullable_attr.append(k)
         namespace["required_attr"] = required_attr
         namespace["non_nullable_attr"] = non_nullable_attr
+        namespace["fields"] = fields
+        if slots:
+            # Values live in slots named after the fields, so the descriptors
+            # leave the class and validation happens only in __init__.
+            if not compiled or "__init__" in namespace:
+                raise TypeError(f"{name} with slots needs the compiled __init__.")
+            for k, v in fields.items():
+                v.name = k
+                del namespace[k]
+            namespace["__slots__"] = tuple(fields)
+        if compiled and "__init__" not in namespace:
+            namespace["__init__"] = _compile_init(name, fields, slots)
         return super().__new__(self, name, bases, namespace)  # type: ignore[misc]
 
 
+def _compile_init(name: str, fields: Dict[str, "Field"], slots: bool) -> Any:
+    """Build a Request.__init__ specialized for the given fields.
+
+    Checks run in the same phases as Request.__init__: required attributes,
+    nullability, then per-field validation (in field declaration order).
+    """
+    _lines = ["def __init__(self, dict_attr):"]
+    for k, v in fields.items():
+        if v.required:
+            _lines += [
+                f"    if {k!r} not in dict_attr:",
+                f"        raise ValueError('Attribute {k} must be pass in {name}')",
+            ]
+    for k, v in fields.items():
+        if not v.nullable:
+            _lines += [
+                f"    if {k!r} in dict_attr and not dict_attr[{k!r}]:",
+                f"        raise ValueError('Attribute {k} can not be nullable in {name}')",
+            ]
+    _lines.append("    _get = dict_attr.get")
+    if not slots:
+        _lines.append("    _d = self.__dict__")
+    _namespace: Dict[str, Any] = {"_MISSING": _MISSING, "_fields": fields}
+    for k, v in fields.items():
+        _namespace[f"_validate_{k}"] = v.validate
+        _lines.append(f"    v = _get({k!r}, _MISSING)")
+        if slots:
+            _lines.append(f"    self.{k} = None if v is _MISSING else _validate_{k}(v)")
+        else:
+            _lines += [
+                "    if v is not _MISSING:",
+                f"        _d[{k!r}] = _validate_{k}(v)",
+            ]
+    if not slots:
+        # Unknown keys are kept as plain attributes, like Request.__init__ does.
+        _lines += [
+            f"    if len(dict_attr) > {len(fields)} or not dict_attr.keys() <= _fields.keys():",
+            "        for k in dict_attr.keys() - _fields.keys():",
+            "            setattr(self, k, dict_attr[k])",
+        ]
+    exec("\n".join(_lines), _namespace)
+    _init = _namespace["__init__"]
+    _init.__qualname__ = f"{name}.__init__"
+    return _init
+
+
 class Field:
     name = ""
 
@@ -43,40 +181,46 @@ class Field:
         except KeyError:
             return None
 
+    def __set__(self, instance: Self, value: Any) -> None:
+        instance.__dict__[self.name] = self.validate(value)
+
+    def validate(self, value: Any) -> Any:
+        return value
+
 
 class CharField(Field):
-    def __set__(self, instance: Self, value: Any) -> None:
+    def validate(self, value: Any) -> Any:
         if isinstance(value, str):
-            instance.__dict__[self.name] = value
+            return value
         else:
             raise ValueError("CharField must be str")
 
 
 class ArgumentsField(Field):
-    def __set__(self, instance: Self, value: Any) -> None:
+    def validate(self, value: Any) -> Any:
         if isinstance(value, dict):
-            instance.__dict__[self.name] = value
+            return value
         else:
             raise ValueError("ArgumentsField must be dict")
 
 
 class EmailField(CharField):
-    def __set__(self, instance: Self, value: Any) -> None:
-        super().__set__(instance, value)
-        if not re.match(EMAIL, value):
+    def validate(self, value: Any) -> Any:
+        value = super().validate(value)
+        if not is_valid_email(value):
             raise ValueError(f"{value} isn't valid email.")
 
-        instance.__dict__[self.name] = value
+        return value
 
 
 class PhoneField(Field):
-    def __set__(self, instance: Self, value: Any) -> None:
+    def validate(self, value: Any) -> Any:
         if not isinstance(value, str) and not isinstance(value, int):
             raise ValueError(
                 f"Invalid type for phone number. {value} is {type(value)}, not str or int"
             )
 
-        if isinstance(value, int):
+        if type(value) is not str:
             value = str(value)
 
         if len(value) != 11:
@@ -84,54 +228,69 @@ class PhoneField(Field):
                 f"Invalid phone number: {value}. Phone must have 11 digits."
             )
 
-        if int(value[0]) != 7:
+        if value[0] != "7" and int(value[0]) != 7:
             raise ValueError(f"Invalid phone number: {value}. Phone must start with 7.")
 
-        instance.__dict__[self.name] = value
+        return value
 
 
 class DateField(Field):
-    def __set__(self, instance: Self, value: Any) -> None:
+    def validate(self, value: Any) -> Any:
         try:
-            value = datetime.datetime.strptime(value, "%d.%m.%Y")
+            value = parse_date_cached(value)
         except ValueError as e:
             raise ValueError(e) from e
-        instance.__dict__[self.name] = value
+        return value
 
 
 class BirthDayField(Field):
-    def __set__(self, instance: Self, value: Any) -> None:
+    def validate(self, value: Any) -> Any:
         try:
-            value = datetime.datetime.strptime(value, "%d.%m.%Y")
+            value = parse_date_cached(value)
         except ValueError as e:
             raise ValueError(e) from e
-        _current_date = datetime.datetime.combine(
-            datetime.date.today(), datetime.datetime.min.time()
-        )
-        _difference = round((_current_date - value).days / 365.25, 0)
+        _difference = round((today_midnight() - value).days / 365.25, 0)
         if _difference > 70.0:
             raise ValueError(
                 f"Invalid birthday: {value}. Difference between current date is too long."
             )
 
-        instance.__dict__[self.name] = value
+        return value
 
 
 class GenderField(Field):
-    def __set__(self, instance: Self, value: Any) -> None:
+    def validate(self, value: Any) -> Any:
         if not isinstance(value, int) or value not in [0, 1, 2]:
             raise ValueError(f"Invalid gender: {value}. Gender must be 0, 1 or 2.")
-        instance.__dict__[self.name] = value
+        return value
 
 
 class ClientIDsField(Field):
-    def __set__(self, instance: Self, value: Any) -> None:
+    def __init__(
+        self,
+        required: bool = True,
+        nullable: bool = True,
+        max_items: int = MAX_CLIENT_IDS,
+    ):
+        super().__init__(required, nullable)
+        self.max_items = max_items
+
+    def validate(self, value: Any) -> Any:
         if not isinstance(value, list):
             raise ValueError(f"Invalid clients ids: {value}. Clients ids must be list.")
-        instance.__dict__[self.name] = value
+        if len(value) > self.max_items:
+            raise PayloadTooLarge(
+                f"Too many clients ids: {len(value)}, at most {self.max_items} allowed."
+            )
+        # Ids are cache and store keys, bool is an int subclass but not an id.
+        if not all(type(_id) is int for _id in value):
+            raise ValueError(f"Invalid clients ids: {value}. Clients ids must be int.")
+        return value
 
 
 class Request(metaclass=RequestORM):
+    __slots__ = ()
+
     def __init__(self, dict_attr: Dict):
         # if _json is not None:
         #     dict_attr: Dict[str, Any] = json.loads(_json)
@@ -151,12 +310,12 @@ class Request(metaclass=RequestORM):
             setattr(self, name, field)
 
 
-class ClientsInterestsRequest(Request):
+class ClientsInterestsRequest(Request, slots=True):
     client_ids = ClientIDsField(required=True)
     date = DateField(required=False, nullable=True)
 
 
-class OnlineScoreRequest(Request):
+class OnlineScoreRequest(Request, slots=True):
     first_name = CharField(required=False, nullable=True)
     last_name = CharField(required=False, nullable=True)
     email = EmailField(required=False, nullable=True)
@@ -176,7 +335,7 @@ class OnlineScoreRequest(Request):
         return score
 
 
-class MethodRequest(Request):
+class MethodRequest(Request, slots=True):
     account = CharField(required=False, nullable=True)
     login = CharField(required=True, nullable=True)
     token = CharField(required=True, nullable=True)
@@ -186,3 +345,11 @@ class MethodRequest(Request):
     @property
     def is_admin(self) -> bool:
         return self.login == ADMIN_LOGIN
+
+
+def configure_limits(max_client_ids: int = MAX_CLIENT_IDS) -> None:
+    ClientsInterestsRequest.fields["client_ids"].max_items = max_client_ids  # type: ignore
+
+
+def max_client_ids() -> int:
+    return ClientsInterestsRequest.fields["client_ids"].max_items  # type: ignore
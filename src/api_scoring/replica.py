@@ -0,0 +1,292 @@
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from api_scoring import metrics
+from api_scoring.score import (
+    INTERESTS_BATCH_SIZE,
+    INTERESTS_SCAN_PAGE,
+    SCORE_BATCH_SIZE,
+)
+from api_scoring.store import Row, Store
+from tarantool.error import NetworkError
+
+REPLICA_REFRESH_INTERVAL = 30.0
+REPLICA_MAX_STALENESS = 120.0
+# Pause between scanned pages, keeps a refresh from hogging tarantool.
+REPLICA_PAGE_PAUSE = 0.01
+
+
+class InterestsSnapshot:
+    """Read-only copy of the interests space in flat arrays.
+
+    Client ids are kept sorted in an int64 array and looked up by bisection.
+    The interests of the i-th client are codes[offsets[i]:offsets[i + 1]],
+    indexes into one list of interned strings. Arrays hold no Python objects
+    per client, so millions of clients cost a few bytes each and forked
+    workers share the pages untouched.
+    """
+
+    __slots__ = ("ids", "offsets", "codes", "vocabulary", "loaded_at")
+
+    def __init__(
+        self,
+        ids: array,
+        offsets: array,
+        codes: array,
+        vocabulary: List[str],
+        loaded_at: float,
+    ):
+        self.ids = ids
+        self.offsets = offsets
+        self.codes = codes
+        self.vocabulary = vocabulary
+        self.loaded_at = loaded_at
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def get(self, key: int) -> Optional[Row]:
+        _ids = self.ids
+        i = bisect_left(_ids, key)
+        if i == len(_ids) or _ids[i] != key:
+            return None
+        _start, _end = self.offsets[i], self.offsets[i + 1]
+        _vocabulary = self.vocabulary
+        return key, [_vocabulary[_code] for _code in self.codes[_start:_end]]
+
+
+def build_snapshot(
+    pages: Iterable[Sequence[Row]], loaded_at: float, page_pause: float = 0.0
+) -> InterestsSnapshot:
+    """Index (client_id, interests) rows, pages may come in any key order."""
+    _ids = array("q")
+    _offsets = array("I", [0])
+    _codes = array("I")
+    _vocabulary: List[str] = []
+    _index: Dict[str, int] = {}
+    for _page in pages:
+        for _row in _page:
+            _ids.append(_row[0])
+            for _interest in _row[1] or ():
+                _code = _index.get(_interest)
+                if _code is None:
+                    _code = _index[_interest] = len(_vocabulary)
+                    _vocabulary.append(sys.intern(_interest))
+                _codes.append(_code)
+            _offsets.append(len(_codes))
+        if page_pause:
+            time.sleep(page_pause)
+    if any(_ids[i] >= _ids[i + 1] for i in range(len(_ids) - 1)):
+        _ids, _offsets, _codes = _sorted(_ids, _offsets, _codes)
+    return InterestsSnapshot(_ids, _offsets, _codes, _vocabulary, loaded_at)
+
+
+def _sorted(ids: array, offsets: array, codes: array) -> Tuple[array, array, array]:
+    # Shards are scanned one after another, each in its own key order.
+    _order = sorted(range(len(ids)), key=ids.__getitem__)
+    _ids = array("q", (ids[i] for i in _order))
+    _offsets = array("I", [0])
+    _codes = array("I")
+    for i in _order:
+        _start, _end = offsets[i], offsets[i + 1]
+        _codes.extend(codes[_start:_end])
+        _offsets.append(len(_codes))
+    return _ids, _offsets, _codes
+
+
+class InterestsReplica:
+    """In-process snapshot of the interests space, refreshed in the background.
+
+    Every refresh_interval the space is scanned page by page into a new
+    snapshot, which then replaces the old one. fresh() returns None once the
+    snapshot is older than max_staleness, callers then go to the store.
+    """
+
+    def __init__(
+        self,
+        source: Store,
+        refresh_interval: float = REPLICA_REFRESH_INTERVAL,
+        max_staleness: float = REPLICA_MAX_STALENESS,
+        page_size: int = INTERESTS_SCAN_PAGE,
+        page_pause: float = REPLICA_PAGE_PAUSE,
+    ):
+        if max_staleness < refresh_interval:
+            raise ValueError("Replica staleness bound is shorter than its refresh.")
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.page_size = page_size
+        self.page_pause = page_pause
+        self.snapshot: Optional[InterestsSnapshot] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid = 0
+        self._thread_lock = threading.Lock()
+        self._closing = threading.Event()
+        self._failed = metrics.registry.counter(
+            "api_scoring_replica_refresh_failed_total",
+            "Interests replica refreshes lost to store errors.",
+        )
+
+    def age(self) -> float:
+        _snapshot = self.snapshot
+        if _snapshot is None:
+            return float("inf")
+        return time.monotonic() - _snapshot.loaded_at
+
+    def load(self) -> None:
+        """Scan the whole space now, from the calling thread."""
+        # Age counts from the start of the scan, rows read later are newer.
+        _started = time.monotonic()
+        _pages = self.source.scan_interests(self.page_size)
+        self.snapshot = build_snapshot(_pages, _started, self.page_pause)
+        logging.info(
+            "Interests replica loaded %s clients in %.2fs.",
+            len(self.snapshot),
+            time.monotonic() - _started,
+        )
+
+    def refresh(self) -> None:
+        try:
+            self.load()
+        except NetworkError as e:
+            self._failed.inc()
+            logging.error("Interests replica refresh failed: %s", e)
+        except Exception as e:
+            # Keeps the refresh thread alive, the next refresh may succeed.
+            self._failed.inc()
+            logging.exception("Interests replica refresh failed: %s", e)
+
+    def fresh(self) -> Optional[InterestsSnapshot]:
+        self._ensure_thread()
+        if self.age() > self.max_staleness:
+            return None
+        return self.snapshot
+
+    def _ensure_thread(self) -> None:
+        # Started lazily and again after fork, threads do not survive it.
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._thread_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="interests-replica", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        # Every forked worker rescans the space on its own, a random first wait
+        # spreads their scans over one interval.
+        _wait = 0.0
+        if self.snapshot is not None:
+            _wait = random.uniform(0, self.refresh_interval)
+        while not self._closing.wait(_wait):
+            self.refresh()
+            _wait = self.refresh_interval
+
+    def close(self) -> None:
+        self._closing.set()
+
+
+_replica: Optional[InterestsReplica] = None
+
+
+def configure_replica(replica: Optional[InterestsReplica]) -> None:
+    """Replica reported by the api_scoring_replica_* gauges."""
+    global _replica
+    _replica = replica
+
+
+def _replica_stats(field: str) -> Dict[metrics.Labels, float]:
+    if _replica is None:
+        return {}
+    _snapshot = _replica.snapshot
+    if field == "clients":
+        return {(): len(_snapshot) if _snapshot is not None else 0}
+    return {(): _replica.age() if _snapshot is not None else -1}
+
+
+metrics.registry.gauge(
+    "api_scoring_replica_clients",
+    "Clients in the interests replica.",
+    partial(_replica_stats, "clients"),
+)
+metrics.registry.gauge(
+    "api_scoring_replica_age_seconds",
+    "Seconds since the interests replica started its last load, -1 before one.",
+    partial(_replica_stats, "age"),
+)
+
+
+class ReplicaStore(Store):
+    """Serves interests from a replica while it is fresh, the rest from backend."""
+
+    def __init__(self, backend: Store, replica: InterestsReplica):
+        self.backend = backend
+        self.replica = replica
+        self._hits = metrics.registry.counter(
+            "api_scoring_replica_lookups_total",
+            "Interests lookups by where they were served from.",
+            source="replica",
+        )
+        self._fallbacks = metrics.registry.counter(
+            "api_scoring_replica_lookups_total",
+            "Interests lookups by where they were served from.",
+            source="store",
+        )
+
+    def cache_get(self, key: str) -> Optional[Row]:
+        return self.backend.cache_get(key)
+
+    def cache_set(self, key: str, value: float) -> None:
+        self.backend.cache_set(key, value)
+
+    def cache_get_or_set(self, key: str, value: float) -> float:
+        return self.backend.cache_get_or_set(key, value)
+
+    def cache_get_many(
+        self, keys: Sequence[str], batch_size: int = SCORE_BATCH_SIZE
+    ) -> Dict[str, Optional[Row]]:
+        return self.backend.cache_get_many(keys, batch_size)
+
+    def cache_set_many(
+        self, items: Sequence[Tuple[str, float]], batch_size: int = SCORE_BATCH_SIZE
+    ) -> None:
+        self.backend.cache_set_many(items, batch_size)
+
+    def get_interests_many(
+        self, keys: Sequence[int], batch_size: int = INTERESTS_BATCH_SIZE
+    ) -> Dict[int, Optional[Row]]:
+        _snapshot = self.replica.fresh()
+        if _snapshot is None:
+            self._fallbacks.inc(len(keys))
+            return self.backend.get_interests_many(keys, batch_size)
+        _result: Dict[int, Optional[Row]] = {}
+        # Ids that are not integers are left to the store to reject.
+        _other = [key for key in keys if type(key) is not int]
+        for key in keys:
+            if type(key) is int:
+                _result[key] = _snapshot.get(key)
+        self._hits.inc(len(_result))
+        if _other:
+            self._fallbacks.inc(len(_other))
+            _result.update(self.backend.get_interests_many(_other, batch_size))
+        return _result
+
+    def scan_interests(
+        self, page_size: int = INTERESTS_SCAN_PAGE
+    ) -> Iterator[Sequence[Row]]:
+        return self.backend.scan_interests(page_size)
+
+    def close(self) -> None:
+        self.replica.close()
+        self.backend.close()
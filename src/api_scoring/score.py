@@ -1,7 +1,14 @@
 import logging
-from typing import Union, List
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 import tarantool
+from api_scoring import metrics
+from tarantool.error import NetworkError
 
 TARANTOOL_HOST = "127.0.0.1"
 TARANTOOL_PORT = 3302
@@ -9,47 +16,335 @@ TARANTOOL_SCORE_SPACE = "scores"
 TARANTOOL_INTERESTS_SPACE = "interests"
 MAX_ATTEMPTS = 5
 SOCKET_TIMEOUT = 10
+POOL_SIZE = 10
+POOL_TIMEOUT = 5.0
+POOL_IDLE_TIMEOUT = 60.0
+POOL_HEALTH_CHECK_INTERVAL = 30.0
+INTERESTS_BATCH_SIZE = 500
+SCORE_BATCH_SIZE = 500
+INTERESTS_SCAN_PAGE = 10_000
 
+# Resolves a whole batch of primary keys in one request, missing keys map to nil.
+GET_MANY_LUA = """
+local space_name, keys = ...
+local space = box.space[space_name]
+local result = {}
+for i, key in ipairs(keys) do
+    result[i] = space:get(key) or box.NULL
+end
+return result
+"""
 
-def cache_get(key: str) -> Union[int, None]:
-    conn = tarantool.Connection(  # type: ignore
-        host=TARANTOOL_HOST,
-        port=TARANTOOL_PORT,
-        reconnect_max_attempts=MAX_ATTEMPTS,
-        socket_timeout=SOCKET_TIMEOUT,
-    )
-    response = conn.select(space_name=TARANTOOL_SCORE_SPACE, key=key)
-    conn.close()
+# Stored function installed by tarantool/tarantool_build_db.py: returns the
+# score stored for a key, or stores the given one and returns it.
+SCORE_FUNCTION = "api_scoring_score_get_or_set"
+
+# Stores a whole batch of tuples in one transaction, existing keys are replaced.
+SET_MANY_LUA = """
+local space_name, tuples = ...
+local space = box.space[space_name]
+box.begin()
+for _, t in ipairs(tuples) do
+    space:replace(t)
+end
+box.commit()
+return #tuples
+"""
+
+
+_store_errors = metrics.store_error()
+
+
+class PoolTimeoutError(NetworkError):
+    pass
+
+
+class ConnectionPool:
+    """Bounded thread-safe pool of persistent tarantool connections.
+
+    Connections that raised NetworkError are dropped and reopened on demand.
+    A forked child drops the connections it inherited and opens its own.
+    """
+
+    def __init__(
+        self,
+        host: str = TARANTOOL_HOST,
+        port: int = TARANTOOL_PORT,
+        size: int = POOL_SIZE,
+        timeout: float = POOL_TIMEOUT,
+        idle_timeout: float = POOL_IDLE_TIMEOUT,
+        health_check_interval: float = POOL_HEALTH_CHECK_INTERVAL,
+        socket_timeout: float = SOCKET_TIMEOUT,
+        max_attempts: int = MAX_ATTEMPTS,
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be positive.")
+        self.host = host
+        self.port = port
+        self.size = size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.socket_timeout = socket_timeout
+        self.max_attempts = max_attempts
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._created = 0
+        self._closed = False
+        self._pid = os.getpid()
+        self._cond = threading.Condition(threading.Lock())
+
+    def _connect(self) -> Any:
+        return tarantool.Connection(  # type: ignore
+            host=self.host,
+            port=self.port,
+            reconnect_max_attempts=self.max_attempts,
+            socket_timeout=self.socket_timeout,
+        )
+
+    def _discard(self, conn: Any) -> None:
+        try:
+            conn.close()
+        except Exception as e:
+            logging.debug("Error while closing tarantool connection: %s", e)
+
+    def _forget_inherited(self) -> List[Any]:
+        # Sockets copied by fork are shared with the parent, the child must
+        # not talk over them. Closing the child's copy leaves the parent's open.
+        if self._pid == os.getpid():
+            return []
+        self._pid = os.getpid()
+        _inherited = [conn for conn, _ in self._idle]
+        self._idle.clear()
+        self._created = 0
+        return _inherited
+
+    def _evict_idle(self, now: float) -> List[Any]:
+        # Idle connections are kept oldest first, so expired ones sit on the left.
+        _expired = []
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            _expired.append(self._idle.popleft()[0])
+            self._created -= 1
+        return _expired
+
+    def _is_healthy(self, conn: Any, last_used: float, now: float) -> bool:
+        if conn.is_closed():
+            return False
+        if now - last_used < self.health_check_interval:
+            return True
+        try:
+            conn.ping(notime=True)
+        except NetworkError:
+            return False
+        return True
+
+    def acquire(self) -> Any:
+        _deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed.")
+                _now = time.monotonic()
+                _expired = self._forget_inherited() + self._evict_idle(_now)
+                _conn, _last_used, _create = None, 0.0, False
+                if self._idle:
+                    _conn, _last_used = self._idle.pop()
+                elif self._created < self.size:
+                    self._created += 1
+                    _create = True
+                else:
+                    _remaining = _deadline - _now
+                    if _remaining <= 0 or not self._cond.wait(_remaining):
+                        raise PoolTimeoutError(
+                            f"No free tarantool connection in pool after {self.timeout} s."
+                        )
+            for _old in _expired:
+                self._discard(_old)
+
+            if _create:
+                try:
+                    return self._connect()
+                except Exception:
+                    self._forget()
+                    raise
+            if _conn is None:
+                continue
+            if self._is_healthy(_conn, _last_used, _now):
+                return _conn
+            logging.info("Dropping unhealthy tarantool connection.")
+            self._discard(_conn)
+            self._forget()
+
+    def _forget(self) -> None:
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
+
+    def release(self, conn: Any, broken: bool = False) -> None:
+        with self._cond:
+            if not broken and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+        self._discard(conn)
+        self._forget()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        try:
+            conn = self.acquire()
+        except NetworkError:
+            _store_errors.inc()
+            raise
+        broken = False
+        try:
+            yield conn
+        except NetworkError:
+            _store_errors.inc()
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            _idle = [conn for conn, _ in self._idle]
+            self._created -= len(_idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in _idle:
+            self._discard(conn)
+
+
+def chunked(items: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    for _start in range(0, len(items), size):
+        _end = _start + size
+        yield items[_start:_end]
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def configure_pool(**kwargs: Any) -> ConnectionPool:
+    """Replace the process-wide pool, closing the previous one."""
+    global _pool
+    with _pool_lock:
+        _old, _pool = _pool, ConnectionPool(**kwargs)
+    if _old is not None:
+        _old.close()
+    return _pool
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+@metrics.store_op("select_score").timed
+def cache_get(key: str, pool: Optional[ConnectionPool] = None) -> Union[int, None]:
+    with (pool or get_pool()).connection() as conn:
+        response = conn.select(space_name=TARANTOOL_SCORE_SPACE, key=key)
     if response:
-        logging.info(f"{response} was selected from tarantool.")
+        logging.info("%s was selected from tarantool.", response)
         return response[0]
     else:
         return None
 
 
-def cache_set(key: str, value: float) -> None:
-    conn = tarantool.Connection(  # type: ignore
-        host=TARANTOOL_HOST,
-        port=TARANTOOL_PORT,
-        reconnect_max_attempts=MAX_ATTEMPTS,
-        socket_timeout=SOCKET_TIMEOUT,
-    )
-    response = conn.insert(space_name=TARANTOOL_SCORE_SPACE, values=(key, value))
-    logging.info(f"{response} was inserted in tarantool.")
-    conn.close()
-
-
-def tarantool_get_interests(key: int) -> Union[List[str], None]:
-    conn = tarantool.Connection(  # type: ignore
-        host=TARANTOOL_HOST,
-        port=TARANTOOL_PORT,
-        reconnect_max_attempts=MAX_ATTEMPTS,
-        socket_timeout=SOCKET_TIMEOUT,
-    )
-    response = conn.select(space_name=TARANTOOL_INTERESTS_SPACE, key=key)
-    conn.close()
+@metrics.store_op("insert_score").timed
+def cache_set(key: str, value: float, pool: Optional[ConnectionPool] = None) -> None:
+    with (pool or get_pool()).connection() as conn:
+        response = conn.replace(space_name=TARANTOOL_SCORE_SPACE, values=(key, value))
+    logging.info("%s was stored in tarantool.", response)
+
+
+@metrics.store_op("get_or_set_score").timed
+def cache_get_or_set(
+    key: str, value: float, pool: Optional[ConnectionPool] = None
+) -> float:
+    with (pool or get_pool()).connection() as conn:
+        response = conn.call(SCORE_FUNCTION, (key, value))
+    return float(response[0])
+
+
+@metrics.store_op("select_interests").timed
+def tarantool_get_interests(
+    key: int, pool: Optional[ConnectionPool] = None
+) -> Union[List[str], None]:
+    with (pool or get_pool()).connection() as conn:
+        response = conn.select(space_name=TARANTOOL_INTERESTS_SPACE, key=key)
     if response:
-        logging.info(f"{response} was selected from tarantool.")
+        logging.info("%s was selected from tarantool.", response)
         return response[0]
     else:
         return None
+
+
+@metrics.store_op("get_interests_many").timed
+def tarantool_get_interests_many(
+    keys: Sequence[int],
+    batch_size: int = INTERESTS_BATCH_SIZE,
+    pool: Optional[ConnectionPool] = None,
+) -> Dict[int, Union[List[str], None]]:
+    _result: Dict[int, Union[List[str], None]] = {}
+    _keys = list(dict.fromkeys(keys))
+    with (pool or get_pool()).connection() as conn:
+        for _batch in chunked(_keys, batch_size):
+            response = conn.eval(GET_MANY_LUA, TARANTOOL_INTERESTS_SPACE, _batch)
+            _tuples = response[0] if response else []
+            _result.update(zip(_batch, _tuples))
+            logging.info("%s interests were selected from tarantool.", len(_batch))
+    return _result
+
+
+@metrics.store_op("scan_interests").timed
+def tarantool_scan_interests(
+    after: Optional[int],
+    limit: int = INTERESTS_SCAN_PAGE,
+    pool: Optional[ConnectionPool] = None,
+) -> List[Any]:
+    """Next page of the interests space in primary key order, after a key."""
+    with (pool or get_pool()).connection() as conn:
+        if after is None:
+            response = conn.select(space_name=TARANTOOL_INTERESTS_SPACE, limit=limit)
+        else:
+            response = conn.select(
+                space_name=TARANTOOL_INTERESTS_SPACE,
+                key=after,
+                iterator="GT",
+                limit=limit,
+            )
+    return list(response)
+
+
+@metrics.store_op("get_scores_many").timed
+def cache_get_many(
+    keys: Sequence[str],
+    batch_size: int = SCORE_BATCH_SIZE,
+    pool: Optional[ConnectionPool] = None,
+) -> Dict[str, Union[List[Any], None]]:
+    _result: Dict[str, Union[List[Any], None]] = {}
+    _keys = list(dict.fromkeys(keys))
+    with (pool or get_pool()).connection() as conn:
+        for _batch in chunked(_keys, batch_size):
+            response = conn.eval(GET_MANY_LUA, TARANTOOL_SCORE_SPACE, _batch)
+            _result.update(zip(_batch, response[0] if response else []))
+            logging.info("%s scores were selected from tarantool.", len(_batch))
+    return _result
+
+
+@metrics.store_op("set_scores_many").timed
+def cache_set_many(
+    items: Sequence[Tuple[str, float]],
+    batch_size: int = SCORE_BATCH_SIZE,
+    pool: Optional[ConnectionPool] = None,
+) -> None:
+    with (pool or get_pool()).connection() as conn:
+        for _batch in chunked(items, batch_size):
+            conn.eval(SET_MANY_LUA, TARANTOOL_SCORE_SPACE, [list(t) for t in _batch])
+            logging.info("%s scores were stored in tarantool.", len(_batch))
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type, Union
+
+from api_scoring.score import (
+    GET_MANY_LUA,
+    INTERESTS_BATCH_SIZE,
+    SOCKET_TIMEOUT,
+    TARANTOOL_HOST,
+    TARANTOOL_INTERESTS_SPACE,
+    TARANTOOL_PORT,
+    TARANTOOL_SCORE_SPACE,
+    chunked,
+)
+
+try:
+    import asynctnt
+    from asynctnt.exceptions import TarantoolNetworkError
+except ImportError:  # pragma: no cover
+    asynctnt = None
+    TarantoolNetworkError = ConnectionError
+
+CONNECT_TIMEOUT = 3.0
+
+# Errors meaning the store is unreachable, as opposed to bad requests.
+ASYNC_NETWORK_ERRORS: Tuple[Type[BaseException], ...] = (
+    OSError,
+    asyncio.TimeoutError,
+    TarantoolNetworkError,
+)
+
+_settings: Dict[str, Any] = {
+    "host": TARANTOOL_HOST,
+    "port": TARANTOOL_PORT,
+    "connect_timeout": CONNECT_TIMEOUT,
+    "request_timeout": SOCKET_TIMEOUT,
+}
+_connection: Any = None
+_connection_lock: Optional[asyncio.Lock] = None
+
+
+def configure_async(**kwargs: Any) -> None:
+    """Set connection options for the next get_connection call."""
+    _settings.update(kwargs)
+
+
+async def get_connection() -> Any:
+    # One asynctnt connection multiplexes all in-flight requests of the loop.
+    global _connection, _connection_lock
+    if asynctnt is None:
+        raise RuntimeError("asynctnt is required for the asyncio store path.")
+    if _connection is not None and _connection.is_connected:
+        return _connection
+    if _connection_lock is None:
+        _connection_lock = asyncio.Lock()
+    async with _connection_lock:
+        if _connection is None or not _connection.is_connected:
+            _connection = asynctnt.Connection(**_settings)
+            await _connection.connect()
+    return _connection
+
+
+async def close_connection() -> None:
+    global _connection, _connection_lock
+    if _connection is not None:
+        await _connection.disconnect()
+    _connection, _connection_lock = None, None
+
+
+async def cache_get_async(key: str) -> Union[list, None]:
+    conn = await get_connection()
+    response = await conn.select(TARANTOOL_SCORE_SPACE, [key])
+    if len(response):
+        logging.info("%s was selected from tarantool.", key)
+        return list(response[0])
+    else:
+        return None
+
+
+async def cache_set_async(key: str, value: float) -> None:
+    conn = await get_connection()
+    await conn.replace(TARANTOOL_SCORE_SPACE, [key, value])
+    logging.info("%s was stored in tarantool.", key)
+
+
+async def tarantool_get_interests_many_async(
+    keys: Sequence[int], batch_size: int = INTERESTS_BATCH_SIZE
+) -> Dict[int, Union[List[str], None]]:
+    conn = await get_connection()
+    _keys = list(dict.fromkeys(keys))
+    _batches = list(chunked(_keys, batch_size))
+    # Batches go out concurrently over the same connection.
+    _responses = await asyncio.gather(
+        *(
+            conn.eval(GET_MANY_LUA, [TARANTOOL_INTERESTS_SPACE, list(_batch)])
+            for _batch in _batches
+        )
+    )
+    _result: Dict[int, Union[List[str], None]] = {}
+    for _batch, response in zip(_batches, _responses):
+        _result.update(zip(_batch, response[0] if len(response) else []))
+    logging.info("%s interests were selected from tarantool.", len(_keys))
+    return _result
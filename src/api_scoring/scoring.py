@@ -1,34 +1,171 @@
 import hashlib
-import json
 import logging
+from functools import partial
+from itertools import chain
+from typing import Any, Dict, Iterator, List, Optional
 
+from api_scoring import metrics
+from api_scoring.breaker import CircuitOpenError
+from api_scoring.cache import (
+    INTERESTS_CACHE_SIZE,
+    INTERESTS_CACHE_TTL,
+    MISSING,
+    SCORE_CACHE_SIZE,
+    SCORE_CACHE_TTL,
+    LRUCache,
+)
 from api_scoring.models import ClientsInterestsRequest, OnlineScoreRequest
-from api_scoring.score import cache_get, cache_set, tarantool_get_interests
+from api_scoring.score import INTERESTS_BATCH_SIZE, chunked
+from api_scoring.score_async import (
+    ASYNC_NETWORK_ERRORS,
+    cache_get_async,
+    cache_set_async,
+    tarantool_get_interests_many_async,
+)
+from api_scoring.singleflight import AsyncSingleFlight, SingleFlight
+from api_scoring.store import Store, get_store
 from tarantool.error import NetworkError
 
+_interests_batch_size = INTERESTS_BATCH_SIZE
+score_cache = LRUCache(SCORE_CACHE_SIZE, SCORE_CACHE_TTL)
+interests_cache = LRUCache(INTERESTS_CACHE_SIZE, INTERESTS_CACHE_TTL)
+# Concurrent misses for the same uid or client id share one store round trip.
+_score_flight = SingleFlight("score")
+_interests_flight = SingleFlight("interests")
+_score_flight_async = AsyncSingleFlight("score_async")
+_interests_flight_async = AsyncSingleFlight("interests_async")
+
+
+def configure_interests(batch_size: int) -> None:
+    global _interests_batch_size
+    if batch_size < 1:
+        raise ValueError("Interests batch size must be positive.")
+    _interests_batch_size = batch_size
+
+
+def configure_caches(
+    score_size: int = SCORE_CACHE_SIZE,
+    score_ttl: float = SCORE_CACHE_TTL,
+    interests_size: int = INTERESTS_CACHE_SIZE,
+    interests_ttl: float = INTERESTS_CACHE_TTL,
+) -> None:
+    global score_cache, interests_cache
+    score_cache = LRUCache(score_size, score_ttl)
+    interests_cache = LRUCache(interests_size, interests_ttl)
+
+
+CACHE_METRICS = (
+    ("hits", "Local cache hits."),
+    ("misses", "Local cache misses."),
+    ("size", "Entries in the local cache."),
+    ("hit_ratio", "Local cache hits per lookup."),
+)
+
+
+def _cache_stats(field: str) -> Dict[metrics.Labels, float]:
+    # Read at render time, so caches rebound by configure_caches are reported.
+    _result: Dict[metrics.Labels, float] = {}
+    for _name, _cache in (("score", score_cache), ("interests", interests_cache)):
+        _stats = _cache.stats()
+        if field == "hit_ratio":
+            _lookups = _stats["hits"] + _stats["misses"]
+            _value = _stats["hits"] / _lookups if _lookups else 0.0
+        else:
+            _value = _stats[field]
+        _result[(("cache", _name),)] = _value
+    return _result
+
+
+for _field, _help in CACHE_METRICS:
+    metrics.registry.gauge(
+        f"api_scoring_cache_{_field}", _help, partial(_cache_stats, _field)
+    )
+
+
+def _log_store_error(e: NetworkError) -> None:
+    # An open breaker is already logged once by the breaker itself.
+    if isinstance(e, CircuitOpenError):
+        logging.debug(e)
+    else:
+        logging.exception(e)
+
 
 def get_key(_online_score_requst: OnlineScoreRequest) -> str:
+    _birthday = _online_score_requst.birthday
     key_parts = [
         _online_score_requst.first_name or "",
         _online_score_requst.last_name or "",
         _online_score_requst.phone or "",
-        _online_score_requst.birthday.strftime("%d.%m.%Y") or "",  # type: ignore
+        _birthday.strftime("%d.%m.%Y") if _birthday else "",  # type: ignore
     ]
     key = "uid:" + hashlib.md5("".join(key_parts).encode("utf-8")).hexdigest()  # type: ignore
     return key
 
 
-def get_score(_online_score_requst: OnlineScoreRequest) -> float:
+@metrics.stage("get_score").timed
+def get_score(
+    _online_score_requst: OnlineScoreRequest, store: Optional[Store] = None
+) -> float:
+    _store = store or get_store()
     key = get_key(_online_score_requst)
-    responce_score = None
+    _cached = score_cache.get(key)
+    if _cached is not MISSING:
+        return _cached
+    return _score_flight.do(
+        key, _load_score, key, _online_score_requst, _store, group=_store
+    )
+
+
+def _load_score(
+    key: str, _online_score_requst: OnlineScoreRequest, _store: Store
+) -> float:
+    # Computing is cheap, the store keeps the first score it got for a key.
+    score = compute_score(_online_score_requst)
     try:
-        responce_score = cache_get(key)
+        score = _store.cache_get_or_set(key, score)
     except NetworkError as e:
-        logging.exception(f"{e}")
+        _log_store_error(e)
+    score_cache.set(key, score)
+    return score
 
-    if responce_score is not None:
-        return float(responce_score[1])  # type: ignore
 
+@metrics.stage("get_scores").timed
+def get_scores(
+    _online_score_requests: List[OnlineScoreRequest], store: Optional[Store] = None
+) -> List[float]:
+    # Bulk variant of get_score: one cache pass, batched store reads and
+    # writes for every request that missed.
+    _store = store or get_store()
+    _keys = [get_key(_request) for _request in _online_score_requests]
+    _scores = score_cache.get_many(_keys)
+    _missing = [key for key in dict.fromkeys(_keys) if key not in _scores]
+    _stored: Dict[str, Any] = {}
+    _store_failed = False
+    if _missing:
+        try:
+            _stored = _store.cache_get_many(_missing)
+        except NetworkError as e:
+            _log_store_error(e)
+            _store_failed = True
+
+    _computed: Dict[str, float] = {}
+    for key, _request in zip(_keys, _online_score_requests):
+        if key in _scores:
+            continue
+        if _stored.get(key) is not None:
+            _scores[key] = float(_stored[key][1])
+        else:
+            _scores[key] = _computed[key] = compute_score(_request)
+    score_cache.set_many((key, _scores[key]) for key in _missing)
+    if _computed and not _store_failed:
+        try:
+            _store.cache_set_many(list(_computed.items()))
+        except NetworkError as e:
+            _log_store_error(e)
+    return [_scores[key] for key in _keys]
+
+
+def compute_score(_online_score_requst: OnlineScoreRequest) -> float:
     score = 0.0
     if _online_score_requst.phone:
         score += 1.5
@@ -38,19 +175,156 @@ def get_score(_online_score_requst: OnlineScoreRequest) -> float:
         score += 1.5
     if _online_score_requst.first_name and _online_score_requst.last_name:
         score += 0.5
+    return score
+
+
+@metrics.stage("get_interests").timed
+def get_interests(
+    _clients_interests_request: ClientsInterestsRequest, store: Optional[Store] = None
+) -> tuple:
+    try:
+        _responce_dict = lookup_interests(
+            _clients_interests_request.client_ids, store  # type: ignore
+        )
+    except NetworkError as e:
+        _log_store_error(e)
+        return "Can not connect with tarantool.", 500
+    return _responce_dict, 200
+
+
+def stream_interests(
+    _clients_interests_request: ClientsInterestsRequest, store: Optional[Store] = None
+) -> tuple:
+    """get_interests returning an iterator of per-batch result dicts.
+
+    The first batch is looked up at once, so an unreachable store is still
+    reported as 500; later failures are raised by the iterator.
+    """
+    _chunks = iter_interests(_clients_interests_request.client_ids, store)  # type: ignore
+    try:
+        _first = next(_chunks, {})
+    except NetworkError as e:
+        _log_store_error(e)
+        return "Can not connect with tarantool.", 500
+    return chain((_first,), _chunks), 200
+
+
+def iter_interests(
+    client_ids: List[Any], store: Optional[Store] = None
+) -> Iterator[Dict[Any, Any]]:
+    # Duplicates are dropped up front, a later batch must not repeat a key.
+    _client_ids = list(dict.fromkeys(client_ids))
+    for _chunk in chunked(_client_ids, _interests_batch_size):
+        yield lookup_interests(list(_chunk), store)
+
+
+@metrics.stage("get_interests_many").timed
+def get_interests_many(
+    _clients_interests_requests: List[ClientsInterestsRequest],
+    store: Optional[Store] = None,
+) -> List[tuple]:
+    # Looks up the union of all client ids once, then splits it per request.
+    _client_ids = [
+        _client
+        for _request in _clients_interests_requests
+        for _client in _request.client_ids  # type: ignore
+    ]
     try:
-        cache_set(key, score)
+        _interests = lookup_interests(_client_ids, store)
     except NetworkError as e:
+        _log_store_error(e)
+        _error = ("Can not connect with tarantool.", 500)
+        return [_error] * len(_clients_interests_requests)
+    return [
+        ({_client: _interests[_client] for _client in _request.client_ids}, 200)  # type: ignore
+        for _request in _clients_interests_requests
+    ]
+
+
+def lookup_interests(
+    client_ids: List[Any], store: Optional[Store] = None
+) -> Dict[Any, Any]:
+    _store = store or get_store()
+    _cached = interests_cache.get_many(client_ids)
+    _missing = [_client for _client in client_ids if _client not in _cached]
+    _fetched = (
+        _interests_flight.do_many(
+            _missing,
+            partial(_store.get_interests_many, batch_size=_interests_batch_size),
+            group=_store,
+        )
+        if _missing
+        else {}
+    )
+    interests_cache.set_many(_fetched.items())
+    return _merge_interests(client_ids, _cached, _fetched)
+
+
+def _merge_interests(client_ids: list, cached: dict, fetched: dict) -> dict:
+    # Keeps the order of client_ids whichever source the entry came from.
+    _responce_dict = dict()
+    for _client in client_ids:
+        _responce_dict[_client] = (
+            cached[_client] if _client in cached else fetched[_client]
+        )
+    return _responce_dict
+
+
+@metrics.stage("get_score").timed
+async def get_score_async(_online_score_requst: OnlineScoreRequest) -> float:
+    key = get_key(_online_score_requst)
+    _cached = score_cache.get(key)
+    if _cached is not MISSING:
+        return _cached
+    return await _score_flight_async.do(
+        key, _load_score_async, key, _online_score_requst
+    )
+
+
+async def _load_score_async(
+    key: str, _online_score_requst: OnlineScoreRequest
+) -> float:
+    responce_score = None
+    try:
+        responce_score = await cache_get_async(key)
+    except ASYNC_NETWORK_ERRORS as e:
+        logging.exception(e)
+
+    if responce_score is not None:
+        score = float(responce_score[1])
+        score_cache.set(key, score)
+        return score
+
+    score = compute_score(_online_score_requst)
+    score_cache.set(key, score)
+    try:
+        await cache_set_async(key, score)
+    except ASYNC_NETWORK_ERRORS as e:
         logging.exception(e)
     return score
 
 
-def get_interests(_clients_interests_request: ClientsInterestsRequest) -> tuple:
-    _responce_dict = dict()
-    for _client in _clients_interests_request.client_ids:  # type: ignore
-        try:
-            _responce_dict[_client] = tarantool_get_interests(_client)
-        except NetworkError as e:
-            logging.exception(e)
-            return json.dumps("Can not connect with tarantool."), 500
-    return _responce_dict, 200
+@metrics.stage("get_interests").timed
+async def get_interests_async(
+    _clients_interests_request: ClientsInterestsRequest,
+) -> tuple:
+    _client_ids = _clients_interests_request.client_ids
+    _cached = interests_cache.get_many(_client_ids)  # type: ignore
+    _missing = [_client for _client in _client_ids if _client not in _cached]  # type: ignore
+    try:
+        _fetched = (
+            await _interests_flight_async.do_many(
+                _missing,
+                partial(
+                    tarantool_get_interests_many_async,
+                    batch_size=_interests_batch_size,
+                ),
+            )
+            if _missing
+            else {}
+        )
+    except ASYNC_NETWORK_ERRORS as e:
+        logging.exception(e)
+        return "Can not connect with tarantool.", 500
+    interests_cache.set_many(_fetched.items())
+    return _merge_interests(_client_ids, _cached, _fetched), 200  # type: ignore
@@ -0,0 +1,72 @@
+import json
+import logging
+from typing import Any, Callable, Dict, Optional
+
+AUTO = "auto"
+JSON_BACKENDS = ("orjson", "ujson", "json")
+
+
+def _json_loads(data: bytes) -> Any:
+    return json.loads(data)
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj).encode("utf-8")
+
+
+def _orjson_codec() -> Dict[str, Callable]:
+    import orjson
+
+    _option = orjson.OPT_NON_STR_KEYS
+
+    def _dumps(obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj, option=_option)
+        except TypeError:
+            # orjson rejects integers wider than 64 bits, json does not.
+            return _json_dumps(obj)
+
+    return {"loads": orjson.loads, "dumps": _dumps}
+
+
+def _ujson_codec() -> Dict[str, Callable]:
+    import ujson
+
+    def _dumps(obj: Any) -> bytes:
+        return ujson.dumps(obj).encode("utf-8")
+
+    return {"loads": ujson.loads, "dumps": _dumps}
+
+
+_CODECS: Dict[str, Callable[[], Dict[str, Callable]]] = {
+    "orjson": _orjson_codec,
+    "ujson": _ujson_codec,
+    "json": lambda: {"loads": _json_loads, "dumps": _json_dumps},
+}
+
+# Rebound by select_backend, use them as serializers.loads/serializers.dumps.
+BACKEND = "json"
+loads: Callable[[bytes], Any] = _json_loads
+dumps: Callable[[Any], bytes] = _json_dumps
+
+
+def select_backend(name: Optional[str] = AUTO) -> str:
+    """Pick the JSON backend once, the fastest installed one for "auto"."""
+    global BACKEND, loads, dumps
+    _candidates = JSON_BACKENDS if name in (None, AUTO) else (name,)
+    for _name in _candidates:
+        if _name not in _CODECS:
+            raise ValueError(f"Unknown JSON backend: {_name}.")
+        try:
+            _codec = _CODECS[_name]()
+        except ImportError:
+            if name not in (None, AUTO):
+                raise
+            continue
+        BACKEND, loads, dumps = _name, _codec["loads"], _codec["dumps"]
+        logging.debug("Using %s JSON backend.", _name)
+        break
+    return BACKEND
+
+
+select_backend()
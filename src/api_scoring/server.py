@@ -0,0 +1,195 @@
+import logging
+import os
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Callable, Optional, Set, Tuple, Type
+
+from api_scoring.logs import stop_logging
+
+SINGLE = "single"
+THREADED = "threaded"
+PREFORK = "prefork"
+SERVER_MODES = (SINGLE, THREADED, PREFORK)
+THREAD_WORKERS = 16
+PROCESS_WORKERS = os.cpu_count() or 1
+SHUTDOWN_POLL_INTERVAL = 0.5
+# Idle keep-alive connections hold a worker thread, so keep the timeout short.
+KEEPALIVE_TIMEOUT = 5.0
+KEEPALIVE_MAX_REQUESTS = 1000
+# Clients that give their worker up reconnect at once, socketserver's default
+# backlog of 5 overflows and the kernel resets them.
+LISTEN_BACKLOG = 128
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+
+class ThreadPoolHTTPServer(HTTPServer):
+    """HTTPServer handing accepted connections to a bounded pool of threads.
+
+    At most ``workers`` requests run at once and at most ``workers`` more wait
+    in the queue, after that the accept loop blocks and new clients queue up in
+    the listen backlog. has_queued() tells keep-alive handlers to give their
+    worker up while other connections wait for one.
+    """
+
+    request_queue_size = LISTEN_BACKLOG
+
+    def __init__(
+        self,
+        server_address: Tuple[str, int],
+        handler: Type[BaseHTTPRequestHandler],
+        workers: int = THREAD_WORKERS,
+    ):
+        if workers < 1:
+            raise ValueError("Number of workers must be positive.")
+        super().__init__(server_address, handler)
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(workers * 2)
+        self._queued = 0
+        self._queued_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="http-worker"
+        )
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        self._slots.acquire()
+        with self._queued_lock:
+            self._queued += 1
+        try:
+            self._executor.submit(self._process_request, request, client_address)
+        except RuntimeError:
+            with self._queued_lock:
+                self._queued -= 1
+            self._slots.release()
+            self.shutdown_request(request)
+
+    def has_queued(self) -> bool:
+        return self._queued > 0
+
+    def _process_request(self, request: Any, client_address: Any) -> None:
+        with self._queued_lock:
+            self._queued -= 1
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._executor.shutdown(wait=True)
+
+
+def make_server(
+    server_address: Tuple[str, int],
+    handler: Type[BaseHTTPRequestHandler],
+    threads: int = 1,
+) -> HTTPServer:
+    if threads > 1:
+        return ThreadPoolHTTPServer(server_address, handler, workers=threads)
+    return HTTPServer(server_address, handler)
+
+
+def serve_until_signal(server: HTTPServer) -> None:
+    # serve_forever runs in a helper thread, so SIGINT/SIGTERM only stop the
+    # accept loop and let in-flight requests finish before the socket closes.
+    _stop = threading.Event()
+
+    def _handle_signal(signum: int, frame: Any) -> None:
+        logging.info("Received signal %s, shutting down.", signum)
+        _stop.set()
+
+    signal.signal(signal.SIGINT, _handle_signal)
+    signal.signal(signal.SIGTERM, _handle_signal)
+    _thread = threading.Thread(
+        target=server.serve_forever,
+        kwargs={"poll_interval": SHUTDOWN_POLL_INTERVAL},
+        name="http-server",
+    )
+    _thread.start()
+    while not _stop.wait(SHUTDOWN_POLL_INTERVAL):
+        if not _thread.is_alive():
+            break
+    server.shutdown()
+    _thread.join()
+    server.server_close()
+
+
+class PreforkSupervisor:
+    """Forks worker processes that accept from one shared listening socket."""
+
+    def __init__(
+        self,
+        server: HTTPServer,
+        processes: int = PROCESS_WORKERS,
+        on_exit: Optional[Callable[[], None]] = None,
+    ):
+        if processes < 1:
+            raise ValueError("Number of processes must be positive.")
+        self.server = server
+        self.processes = processes
+        self.on_exit = on_exit
+        self._children: Set[int] = set()
+        self._stopping = False
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            _code = 0
+            try:
+                serve_until_signal(self.server)
+            except Exception:
+                logging.exception("Worker process failed.")
+                _code = 1
+            finally:
+                if self.on_exit is not None:
+                    try:
+                        self.on_exit()
+                    except Exception:
+                        logging.exception("Worker cleanup failed.")
+                stop_logging()
+                logging.shutdown()
+                os._exit(_code)
+        self._children.add(pid)
+
+    def _handle_signal(self, signum: int, frame: Any) -> None:
+        if self._stopping:
+            return
+        logging.info("Received signal %s, stopping workers.", signum)
+        self._stopping = True
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        for _ in range(self.processes):
+            self._spawn()
+        signal.signal(signal.SIGINT, self._handle_signal)
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        logging.info("Started %s worker processes.", self.processes)
+        while self._children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            self._children.discard(pid)
+            if not self._stopping:
+                logging.error(
+                    "Worker %s exited with status %s, restarting.", pid, status
+                )
+                self._spawn()
+        self.server.server_close()
+
+
+def serve_prefork(
+    server: HTTPServer,
+    processes: int = PROCESS_WORKERS,
+    on_exit: Optional[Callable[[], None]] = None,
+) -> None:
+    """Run forked workers, on_exit runs in every worker before it exits."""
+    PreforkSupervisor(server, processes, on_exit).run()
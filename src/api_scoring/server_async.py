@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import signal
+import uuid
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from api_scoring import metrics, serializers
+from api_scoring.logs import access_log, access_sampled
+from api_scoring.server import KEEPALIVE_TIMEOUT, MAX_BODY_SIZE
+
+ASYNC = "async"
+MAX_HEADER_SIZE = 64 * 1024
+
+AsyncRoute = Callable[[Any, Any, Any], Awaitable[tuple]]
+
+
+class AsyncHTTPServer:
+    """Minimal HTTP/1.1 front end serving the method routes on an event loop.
+
+    ``render`` turns a route's (response, code) pair into the JSON envelope,
+    the same way MainHTTPHandler does.
+    """
+
+    def __init__(
+        self,
+        router: Dict[str, AsyncRoute],
+        render: Callable[[Any, int], dict],
+        store: Any = None,
+        keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+        max_body_size: int = MAX_BODY_SIZE,
+    ):
+        self.router = router
+        self.render = render
+        self.store = store
+        self.keepalive_timeout = keepalive_timeout
+        self.max_body_size = max_body_size
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while await self._handle_request(reader, writer):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _handle_request(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> bool:
+        try:
+            _head = await asyncio.wait_for(
+                reader.readuntil(b"\r\n\r\n"), self.keepalive_timeout
+            )
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            return False
+        except asyncio.LimitOverrunError:
+            await self._write(writer, HTTPStatus.BAD_REQUEST, b"", False)
+            return False
+
+        try:
+            _method, _path, _version, _headers = self._parse_head(_head)
+            _length = int(_headers.get("content-length", 0))
+        except ValueError:
+            await self._write(writer, HTTPStatus.BAD_REQUEST, b"", False)
+            return False
+        if _length < 0:
+            await self._write(writer, HTTPStatus.BAD_REQUEST, b"", False)
+            return False
+        if _length > self.max_body_size:
+            # Refused before reading, the unread body ends the connection.
+            await self._write(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, b"", False)
+            return False
+        try:
+            # A client trickling its body would hold the connection forever.
+            _body = await asyncio.wait_for(
+                reader.readexactly(_length), self.keepalive_timeout
+            )
+        except asyncio.TimeoutError:
+            return False
+        _connection = _headers.get("connection", "").lower()
+        _keep_alive = (_version == "HTTP/1.1" and _connection != "close") or (
+            _version == "HTTP/1.0" and _connection == "keep-alive"
+        )
+
+        if _method == "GET" and _path.split("?", 1)[0].strip("/") == "metrics":
+            _metrics = metrics.registry.render().encode("utf-8")
+            await self._write(
+                writer, HTTPStatus.OK, _metrics, _keep_alive, metrics.CONTENT_TYPE
+            )
+            return _keep_alive
+        if _method != "POST":
+            await self._write(writer, HTTPStatus.NOT_IMPLEMENTED, b"", _keep_alive)
+            return _keep_alive
+        _code, _payload = await self._dispatch(_path, _headers, _body)
+        await self._write(writer, _code, _payload, _keep_alive)
+        return _keep_alive
+
+    @staticmethod
+    def _parse_head(head: bytes) -> Tuple[str, str, str, Dict[str, str]]:
+        _request_line, *_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+        _method, _path, _version = _request_line.split(" ", 2)
+        _headers = {}
+        for _line in _lines:
+            _name, _, _value = _line.partition(":")
+            _headers[_name.strip().lower()] = _value.strip()
+        return _method, _path, _version, _headers
+
+    async def _dispatch(
+        self, path: str, headers: Dict[str, str], body: bytes
+    ) -> Tuple[int, bytes]:
+        response: Any = {}
+        code = HTTPStatus.OK
+        context = {"request_id": headers.get("http_x_request_id", uuid.uuid4().hex)}
+        request = None
+        try:
+            request = serializers.loads(body)
+        except ValueError as e:
+            logging.exception(e)
+            code = HTTPStatus.BAD_REQUEST
+
+        _log_access = access_sampled()
+        if request:
+            _path = path.strip("/")
+            _context = context["request_id"]
+            if _log_access:
+                access_log.info("%s: %r %s", path, body, _context)
+            if _path in self.router:
+                try:
+                    response, code = await self.router[_path](
+                        {"body": request, "headers": headers}, context, self.store
+                    )
+                except Exception as e:
+                    logging.exception("Unexpected error: %s", e)
+                    code = HTTPStatus.INTERNAL_SERVER_ERROR
+            else:
+                code = HTTPStatus.NOT_FOUND
+
+        r = self.render(response, int(code))
+        context.update(r)
+        if _log_access:
+            access_log.info(context)
+        _route = path.strip("/")
+        metrics.request_counter(_route if _route in self.router else "", code).inc()
+        return code, serializers.dumps(r)
+
+    @staticmethod
+    async def _write(
+        writer: asyncio.StreamWriter,
+        code: int,
+        payload: bytes,
+        keep_alive: bool,
+        content_type: str = "application/json",
+    ) -> None:
+        _status = HTTPStatus(code)
+        _head = (
+            f"HTTP/1.1 {_status.value} {_status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(_head.encode("latin-1") + payload)
+        await writer.drain()
+
+
+async def serve_async(
+    server_address: Tuple[str, int],
+    router: Dict[str, AsyncRoute],
+    render: Callable[[Any, int], dict],
+    store: Any = None,
+    keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+    on_shutdown: Optional[Callable[[], Awaitable[None]]] = None,
+    max_body_size: int = MAX_BODY_SIZE,
+) -> None:
+    _server = AsyncHTTPServer(router, render, store, keepalive_timeout, max_body_size)
+    _stop = asyncio.Event()
+    _loop = asyncio.get_running_loop()
+    for _signal in (signal.SIGINT, signal.SIGTERM):
+        _loop.add_signal_handler(_signal, _stop.set)
+
+    _host, _port = server_address
+    _listener = await asyncio.start_server(
+        _server.handle_connection, _host, _port, limit=MAX_HEADER_SIZE
+    )
+    async with _listener:
+        await _stop.wait()
+        logging.info("Shutting down asyncio server.")
+    if on_shutdown is not None:
+        await on_shutdown()
@@ -0,0 +1,192 @@
+import asyncio
+import threading
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from api_scoring import metrics
+
+SHARED_HELP = "Lookups that waited for an identical in-flight lookup."
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    def wait(self) -> Any:
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Concurrent calls for the same key share one execution and its result.
+
+    do() runs func once per key at a time; threads asking for a key that is
+    already in flight wait for the leader and get its result or exception.
+    do_many() does the same per key for bulk lookups: a caller fetches only
+    the keys nobody else is fetching. Keys are scoped by group, e.g. a store.
+    """
+
+    def __init__(self, name: str):
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[Hashable, Hashable], _Call] = {}
+        self._shared = metrics.registry.counter(
+            "api_scoring_singleflight_shared_total", SHARED_HELP, flight=name
+        )
+
+    def do(
+        self, key: Hashable, func: Callable[..., Any], *args: Any, group: Any = None
+    ) -> Any:
+        _key = (group, key)
+        with self._lock:
+            _call = self._calls.get(_key)
+            _leader = _call is None
+            if _call is None:
+                _call = self._calls[_key] = _Call()
+        if not _leader:
+            self._shared.inc()
+            return _call.wait()
+        try:
+            _call.result = func(*args)
+        except BaseException as e:
+            _call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[_key]
+            _call.event.set()
+        return _call.result
+
+    def do_many(
+        self,
+        keys: Iterable[Hashable],
+        fetch: Callable[[List[Any]], Dict[Any, Any]],
+        group: Any = None,
+    ) -> Dict[Any, Any]:
+        """fetch(keys) must return a value for every key it was given."""
+        _own: Dict[Hashable, _Call] = {}
+        _waits: Dict[Hashable, _Call] = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                _call = self._calls.get((group, key))
+                if _call is None:
+                    _own[key] = self._calls[(group, key)] = _Call()
+                else:
+                    _waits[key] = _call
+        if _waits:
+            self._shared.inc(len(_waits))
+
+        _result: Dict[Any, Any] = {}
+        if _own:
+            try:
+                _result = fetch(list(_own))
+                for key, _call in _own.items():
+                    _call.result = _result.get(key)
+            except BaseException as e:
+                for _call in _own.values():
+                    _call.error = e
+                raise
+            finally:
+                with self._lock:
+                    for key in _own:
+                        del self._calls[(group, key)]
+                for _call in _own.values():
+                    _call.event.set()
+        for key, _call in _waits.items():
+            _result[key] = _call.wait()
+        return _result
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines running on one event loop."""
+
+    def __init__(self, name: str):
+        self._calls: Dict[Tuple[Hashable, Hashable], asyncio.Future] = {}
+        self._shared = metrics.registry.counter(
+            "api_scoring_singleflight_shared_total", SHARED_HELP, flight=name
+        )
+
+    @staticmethod
+    def _settle(
+        future: asyncio.Future, result: Any, error: Optional[BaseException]
+    ) -> None:
+        if isinstance(error, asyncio.CancelledError):
+            future.cancel()
+        elif error is not None:
+            future.set_exception(error)
+            # Marks the exception retrieved, nobody may be waiting for it.
+            future.exception()
+        else:
+            future.set_result(result)
+
+    async def do(
+        self,
+        key: Hashable,
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+        group: Any = None,
+    ) -> Any:
+        _key = (group, key)
+        _future = self._calls.get(_key)
+        if _future is not None:
+            self._shared.inc()
+            return await asyncio.shield(_future)
+        _future = self._calls[_key] = asyncio.get_running_loop().create_future()
+        _result, _error = None, None
+        try:
+            _result = await func(*args)
+            return _result
+        except BaseException as e:
+            _error = e
+            raise
+        finally:
+            del self._calls[_key]
+            self._settle(_future, _result, _error)
+
+    async def do_many(
+        self,
+        keys: Iterable[Hashable],
+        fetch: Callable[[List[Any]], Awaitable[Dict[Any, Any]]],
+        group: Any = None,
+    ) -> Dict[Any, Any]:
+        _loop = asyncio.get_running_loop()
+        _own: Dict[Hashable, asyncio.Future] = {}
+        _waits: Dict[Hashable, asyncio.Future] = {}
+        for key in dict.fromkeys(keys):
+            _future = self._calls.get((group, key))
+            if _future is None:
+                _own[key] = self._calls[(group, key)] = _loop.create_future()
+            else:
+                _waits[key] = _future
+        if _waits:
+            self._shared.inc(len(_waits))
+
+        _result: Dict[Any, Any] = {}
+        if _own:
+            _error = None
+            try:
+                _result = await fetch(list(_own))
+            except BaseException as e:
+                _error = e
+                raise
+            finally:
+                for key, _future in _own.items():
+                    del self._calls[(group, key)]
+                    self._settle(_future, _result.get(key), _error)
+        for key, _future in _waits.items():
+            _result[key] = await asyncio.shield(_future)
+        return _result
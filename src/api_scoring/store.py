@@ -0,0 +1,573 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from api_scoring import metrics, score
+from api_scoring.breaker import FAILURE_THRESHOLD, RESET_TIMEOUT, CircuitBreaker
+from api_scoring.score import (
+    INTERESTS_BATCH_SIZE,
+    INTERESTS_SCAN_PAGE,
+    SCORE_BATCH_SIZE,
+    ConnectionPool,
+)
+from tarantool.error import NetworkError
+
+TARANTOOL = "tarantool"
+MEMORY = "memory"
+STORES = (TARANTOOL, MEMORY)
+SHARD_VNODES = 160
+WRITE_BEHIND_MAX_PENDING = 10_000
+WRITE_BEHIND_FLUSH_INTERVAL = 0.05
+WRITE_BEHIND_PUT_TIMEOUT = 0.1
+WRITE_BEHIND_CLOSE_TIMEOUT = 5.0
+
+Row = Any
+
+
+class Store(ABC):
+    """Backend for scores and client interests.
+
+    Rows are returned the way tarantool stores them: (key, score) for scores
+    and (client_id, interests) for interests, None for missing keys. The bulk
+    score methods fall back to the single-key ones.
+    """
+
+    @abstractmethod
+    def cache_get(self, key: str) -> Optional[Row]:
+        pass
+
+    @abstractmethod
+    def cache_set(self, key: str, value: float) -> None:
+        pass
+
+    def cache_get_or_set(self, key: str, value: float) -> float:
+        """Score stored for key, or value once it has been stored."""
+        _row = self.cache_get(key)
+        if _row is not None:
+            return float(_row[1])
+        self.cache_set(key, value)
+        return value
+
+    def cache_get_many(
+        self, keys: Sequence[str], batch_size: int = SCORE_BATCH_SIZE
+    ) -> Dict[str, Optional[Row]]:
+        return {key: self.cache_get(key) for key in keys}
+
+    def cache_set_many(
+        self, items: Sequence[Tuple[str, float]], batch_size: int = SCORE_BATCH_SIZE
+    ) -> None:
+        for key, value in items:
+            self.cache_set(key, value)
+
+    @abstractmethod
+    def get_interests_many(
+        self, keys: Sequence[int], batch_size: int = INTERESTS_BATCH_SIZE
+    ) -> Dict[int, Optional[Row]]:
+        pass
+
+    @abstractmethod
+    def scan_interests(
+        self, page_size: int = INTERESTS_SCAN_PAGE
+    ) -> Iterator[Sequence[Row]]:
+        """Every interests row, in pages of at most page_size rows."""
+
+    def close(self) -> None:
+        pass
+
+
+class TarantoolStore(Store):
+    """Tarantool behind a connection pool, the process-wide one by default.
+
+    With score_function cache_get_or_set is one call of the SCORE_FUNCTION
+    stored function instead of a select and a replace.
+    """
+
+    def __init__(
+        self, pool: Optional[ConnectionPool] = None, score_function: bool = False
+    ):
+        self.pool = pool
+        self.score_function = score_function
+
+    def cache_get(self, key: str) -> Optional[Row]:
+        return score.cache_get(key, pool=self.pool)
+
+    def cache_set(self, key: str, value: float) -> None:
+        score.cache_set(key, value, pool=self.pool)
+
+    def cache_get_or_set(self, key: str, value: float) -> float:
+        if not self.score_function:
+            return super().cache_get_or_set(key, value)
+        return score.cache_get_or_set(key, value, pool=self.pool)
+
+    def cache_get_many(
+        self, keys: Sequence[str], batch_size: int = SCORE_BATCH_SIZE
+    ) -> Dict[str, Optional[Row]]:
+        return score.cache_get_many(keys, batch_size=batch_size, pool=self.pool)
+
+    def cache_set_many(
+        self, items: Sequence[Tuple[str, float]], batch_size: int = SCORE_BATCH_SIZE
+    ) -> None:
+        score.cache_set_many(items, batch_size=batch_size, pool=self.pool)
+
+    def get_interests_many(
+        self, keys: Sequence[int], batch_size: int = INTERESTS_BATCH_SIZE
+    ) -> Dict[int, Optional[Row]]:
+        return score.tarantool_get_interests_many(
+            keys, batch_size=batch_size, pool=self.pool
+        )
+
+    def scan_interests(
+        self, page_size: int = INTERESTS_SCAN_PAGE
+    ) -> Iterator[Sequence[Row]]:
+        _after = None
+        while True:
+            _page = score.tarantool_scan_interests(_after, page_size, pool=self.pool)
+            if _page:
+                yield _page
+            if len(_page) < page_size:
+                return
+            _after = _page[-1][0]
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+
+
+class MemoryStore(Store):
+    """Dict-backed store for tests, benchmarks and single-process setups."""
+
+    def __init__(self, interests: Optional[Dict[int, List[str]]] = None):
+        self._lock = threading.Lock()
+        self.scores: Dict[str, float] = {}
+        self.interests: Dict[int, List[str]] = dict(interests or {})
+
+    def cache_get(self, key: str) -> Optional[Row]:
+        _score = self.scores.get(key)
+        return None if _score is None else (key, _score)
+
+    def cache_set(self, key: str, value: float) -> None:
+        with self._lock:
+            self.scores[key] = value
+
+    def cache_set_many(
+        self, items: Sequence[Tuple[str, float]], batch_size: int = SCORE_BATCH_SIZE
+    ) -> None:
+        with self._lock:
+            self.scores.update(items)
+
+    def set_interests(self, items: Iterable[Tuple[int, List[str]]]) -> None:
+        with self._lock:
+            self.interests.update(items)
+
+    def get_interests_many(
+        self, keys: Sequence[int], batch_size: int = INTERESTS_BATCH_SIZE
+    ) -> Dict[int, Optional[Row]]:
+        _interests = self.interests
+        return {
+            key: (key, _interests[key]) if key in _interests else None for key in keys
+        }
+
+    def scan_interests(
+        self, page_size: int = INTERESTS_SCAN_PAGE
+    ) -> Iterator[Sequence[Row]]:
+        _rows = sorted(self.interests.items())
+        yield from score.chunked(_rows, page_size)
+
+
+class HashRing:
+    """Consistent hash ring, each node is placed at vnodes points."""
+
+    def __init__(self, nodes: int, vnodes: int = SHARD_VNODES):
+        if nodes < 1:
+            raise ValueError("Hash ring needs at least one node.")
+        _points = sorted(
+            (self._hash(f"{node}:{i}"), node)
+            for node in range(nodes)
+            for i in range(vnodes)
+        )
+        self._hashes = [_hash for _hash, _ in _points]
+        self._nodes = [node for _, node in _points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def node(self, key: Any) -> int:
+        _index = bisect(self._hashes, self._hash(str(key)))
+        return self._nodes[_index % len(self._nodes)]
+
+
+class ShardedStore(Store):
+    """Spreads score keys and client ids over several stores.
+
+    Placement uses a consistent hash ring, so adding a shard moves only
+    about 1/n of the keys.
+    """
+
+    def __init__(self, stores: Sequence[Store], vnodes: int = SHARD_VNODES):
+        self.stores = list(stores)
+        self.ring = HashRing(len(self.stores), vnodes)
+
+    def shard(self, key: Any) -> Store:
+        return self.stores[self.ring.node(key)]
+
+    def _split(
+        self, items: Iterable[Any], key_of: Callable[[Any], Any]
+    ) -> Dict[int, List[Any]]:
+        _groups: Dict[int, List[Any]] = {}
+        for _item in items:
+            _groups.setdefault(self.ring.node(key_of(_item)), []).append(_item)
+        return _groups
+
+    def cache_get(self, key: str) -> Optional[Row]:
+        return self.shard(key).cache_get(key)
+
+    def cache_set(self, key: str, value: float) -> None:
+        self.shard(key).cache_set(key, value)
+
+    def cache_get_or_set(self, key: str, value: float) -> float:
+        return self.shard(key).cache_get_or_set(key, value)
+
+    def cache_get_many(
+        self, keys: Sequence[str], batch_size: int = SCORE_BATCH_SIZE
+    ) -> Dict[str, Optional[Row]]:
+        _result: Dict[str, Optional[Row]] = {}
+        for _node, _keys in self._split(keys, lambda key: key).items():
+            _result.update(self.stores[_node].cache_get_many(_keys, batch_size))
+        return _result
+
+    def cache_set_many(
+        self, items: Sequence[Tuple[str, float]], batch_size: int = SCORE_BATCH_SIZE
+    ) -> None:
+        for _node, _items in self._split(items, lambda item: item[0]).items():
+            self.stores[_node].cache_set_many(_items, batch_size)
+
+    def get_interests_many(
+        self, keys: Sequence[int], batch_size: int = INTERESTS_BATCH_SIZE
+    ) -> Dict[int, Optional[Row]]:
+        _result: Dict[int, Optional[Row]] = {}
+        for _node, _keys in self._split(keys, lambda key: key).items():
+            _result.update(self.stores[_node].get_interests_many(_keys, batch_size))
+        return _result
+
+    def scan_interests(
+        self, page_size: int = INTERESTS_SCAN_PAGE
+    ) -> Iterator[Sequence[Row]]:
+        for _store in self.stores:
+            yield from _store.scan_interests(page_size)
+
+    def close(self) -> None:
+        for _store in self.stores:
+            _store.close()
+
+
+class CircuitBreakerStore(Store):
+    """Fails fast with CircuitOpenError while the backend is considered down."""
+
+    def __init__(self, backend: Store, breaker: Optional[CircuitBreaker] = None):
+        self.backend = backend
+        self.breaker = breaker or CircuitBreaker()
+
+    def cache_get(self, key: str) -> Optional[Row]:
+        with self.breaker.guard():
+            return self.backend.cache_get(key)
+
+    def cache_set(self, key: str, value: float) -> None:
+        with self.breaker.guard():
+            self.backend.cache_set(key, value)
+
+    def cache_get_or_set(self, key: str, value: float) -> float:
+        with self.breaker.guard():
+            return self.backend.cache_get_or_set(key, value)
+
+    def cache_get_many(
+        self, keys: Sequence[str], batch_size: int = SCORE_BATCH_SIZE
+    ) -> Dict[str, Optional[Row]]:
+        with self.breaker.guard():
+            return self.backend.cache_get_many(keys, batch_size)
+
+    def cache_set_many(
+        self, items: Sequence[Tuple[str, float]], batch_size: int = SCORE_BATCH_SIZE
+    ) -> None:
+        with self.breaker.guard():
+            self.backend.cache_set_many(items, batch_size)
+
+    def get_interests_many(
+        self, keys: Sequence[int], batch_size: int = INTERESTS_BATCH_SIZE
+    ) -> Dict[int, Optional[Row]]:
+        with self.breaker.guard():
+            return self.backend.get_interests_many(keys, batch_size)
+
+    def scan_interests(
+        self, page_size: int = INTERESTS_SCAN_PAGE
+    ) -> Iterator[Sequence[Row]]:
+        _pages = self.backend.scan_interests(page_size)
+        while True:
+            with self.breaker.guard():
+                _page = next(_pages, None)
+            if _page is None:
+                return
+            yield _page
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+class WriteBehindStore(Store):
+    """Queues score writes and flushes them to the backend in the background.
+
+    Repeated keys are coalesced, the last value wins. At most max_pending
+    keys wait for a flush; when the queue is full cache_set blocks for up to
+    put_timeout and then drops the write, scores can always be recomputed.
+    Reads and interests go straight to the backend, close() flushes what is
+    left.
+    """
+
+    def __init__(
+        self,
+        backend: Store,
+        max_pending: int = WRITE_BEHIND_MAX_PENDING,
+        flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+        put_timeout: float = WRITE_BEHIND_PUT_TIMEOUT,
+        batch_size: int = SCORE_BATCH_SIZE,
+    ):
+        if max_pending < 1:
+            raise ValueError("Write-behind queue size must be positive.")
+        self.backend = backend
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.batch_size = batch_size
+        self._pending: Dict[str, float] = {}
+        self._flushing: Dict[str, float] = {}
+        self._cond = threading.Condition(threading.Lock())
+        self._thread: Optional[threading.Thread] = None
+        self._pid = 0
+        self._closed = False
+        self._closing = threading.Event()
+        self._dropped = metrics.registry.counter(
+            "api_scoring_write_behind_dropped_total",
+            "Score writes dropped because the write-behind queue was full.",
+        )
+        self._failed = metrics.registry.counter(
+            "api_scoring_write_behind_failed_total",
+            "Score writes lost to store errors.",
+        )
+
+    def _ensure_thread(self) -> None:
+        # Started lazily and again after fork, threads do not survive it, or
+        # after the thread died on an unexpected error.
+        if (
+            self._thread is not None
+            and self._pid == os.getpid()
+            and self._thread.is_alive()
+        ):
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(
+            target=self._run, name="write-behind", daemon=True
+        )
+        self._thread.start()
+
+    def cache_get(self, key: str) -> Optional[Row]:
+        with self._cond:
+            _value = self._pending.get(key, self._flushing.get(key))
+        if _value is not None:
+            return key, _value
+        return self.backend.cache_get(key)
+
+    def cache_get_many(
+        self, keys: Sequence[str], batch_size: int = SCORE_BATCH_SIZE
+    ) -> Dict[str, Optional[Row]]:
+        _result: Dict[str, Optional[Row]] = {}
+        with self._cond:
+            for key in keys:
+                _value = self._pending.get(key, self._flushing.get(key))
+                if _value is not None:
+                    _result[key] = (key, _value)
+        _missing = [key for key in keys if key not in _result]
+        if _missing:
+            _result.update(self.backend.cache_get_many(_missing, batch_size))
+        return _result
+
+    def cache_set(self, key: str, value: float) -> None:
+        self.cache_set_many([(key, value)])
+
+    def cache_set_many(
+        self, items: Sequence[Tuple[str, float]], batch_size: int = SCORE_BATCH_SIZE
+    ) -> None:
+        _deadline = time.monotonic() + self.put_timeout
+        with self._cond:
+            if not self._closed:
+                self._queue(items, _deadline)
+                return
+        self.backend.cache_set_many(items, batch_size)
+
+    def _queue(self, items: Sequence[Tuple[str, float]], deadline: float) -> None:
+        # Called with _cond held.
+        self._ensure_thread()
+        for key, value in items:
+            while key not in self._pending and len(self._pending) >= self.max_pending:
+                _left = deadline - time.monotonic()
+                if _left <= 0:
+                    break
+                self._cond.wait(_left)
+            if key in self._pending or len(self._pending) < self.max_pending:
+                self._pending[key] = value
+            else:
+                self._dropped.inc()
+                logging.warning("Write-behind queue is full, %s was dropped.", key)
+        self._cond.notify_all()
+
+    def get_interests_many(
+        self, keys: Sequence[int], batch_size: int = INTERESTS_BATCH_SIZE
+    ) -> Dict[int, Optional[Row]]:
+        return self.backend.get_interests_many(keys, batch_size)
+
+    def scan_interests(
+        self, page_size: int = INTERESTS_SCAN_PAGE
+    ) -> Iterator[Sequence[Row]]:
+        return self.backend.scan_interests(page_size)
+
+    def _take(self) -> Dict[str, float]:
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            self._flushing, self._pending = self._pending, {}
+            self._cond.notify_all()
+            return self._flushing
+
+    def _flush(self, items: Dict[str, float]) -> None:
+        try:
+            self.backend.cache_set_many(list(items.items()), self.batch_size)
+        except NetworkError as e:
+            self._failed.inc(len(items))
+            logging.error("Write-behind flush of %s scores failed: %s", len(items), e)
+        except Exception as e:
+            # Any other backend error must not kill the flushing thread.
+            self._failed.inc(len(items))
+            logging.exception(
+                "Write-behind flush of %s scores failed: %s", len(items), e
+            )
+        finally:
+            with self._cond:
+                self._flushing = {}
+
+    def _run(self) -> None:
+        while True:
+            _items = self._take()
+            if _items:
+                self._flush(_items)
+            elif self._closed:
+                return
+            # Lets repeated keys coalesce instead of writing one row per flush.
+            self._closing.wait(self.flush_interval)
+
+    def flush(self) -> None:
+        """Write everything queued so far from the calling thread."""
+        with self._cond:
+            self._flushing, self._pending = self._pending, {}
+            _items = self._flushing
+            self._cond.notify_all()
+        if _items:
+            self._flush(_items)
+
+    def close(self) -> None:
+        self._closing.set()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            _thread = self._thread if self._pid == os.getpid() else None
+        if _thread is not None:
+            _thread.join(WRITE_BEHIND_CLOSE_TIMEOUT)
+        self.flush()
+        self.backend.close()
+
+
+def parse_address(value: str) -> Tuple[str, int]:
+    _host, _, _port = value.rpartition(":")
+    return _host or score.TARANTOOL_HOST, int(_port)
+
+
+def build_store(
+    kind: str = TARANTOOL,
+    shards: Sequence[Tuple[str, int]] = (),
+    write_behind: bool = True,
+    write_behind_size: int = WRITE_BEHIND_MAX_PENDING,
+    breaker_failures: int = FAILURE_THRESHOLD,
+    breaker_reset_timeout: float = RESET_TIMEOUT,
+    score_function: bool = False,
+    **pool_kwargs: Any,
+) -> Store:
+    """Store for the command line options, one pool and breaker per shard.
+
+    With score_function scores are written by the lookup itself, so they
+    are not written behind.
+    """
+    if kind == MEMORY:
+        return MemoryStore()
+    if kind != TARANTOOL:
+        raise ValueError(f"Unknown store: {kind}.")
+
+    def _guarded(store: Store, name: str) -> Store:
+        if breaker_failures < 1:
+            return store
+        _breaker = CircuitBreaker(name, breaker_failures, breaker_reset_timeout)
+        return CircuitBreakerStore(store, _breaker)
+
+    if not shards:
+        _store = _guarded(TarantoolStore(score_function=score_function), TARANTOOL)
+    else:
+        _store = ShardedStore(
+            [
+                _guarded(
+                    TarantoolStore(
+                        ConnectionPool(host=_host, port=_port, **pool_kwargs),
+                        score_function,
+                    ),
+                    f"{_host}:{_port}",
+                )
+                for _host, _port in shards
+            ]
+        )
+    if write_behind and not score_function:
+        _store = WriteBehindStore(_store, max_pending=write_behind_size)
+    return _store
+
+
+_store: Optional[Store] = None
+_store_lock = threading.Lock()
+
+
+def configure_store(store: Store) -> Store:
+    """Replace the process-wide default store, closing the previous one."""
+    global _store
+    with _store_lock:
+        _old, _store = _store, store
+    if _old is not None and _old is not store:
+        _old.close()
+    return store
+
+
+def get_store() -> Store:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TarantoolStore()
+    return _store
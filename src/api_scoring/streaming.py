@@ -0,0 +1,70 @@
+from typing import Any, BinaryIO, Union
+
+from api_scoring.models import PayloadTooLarge
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+
+# Bodies up to this size are parsed in one go, larger ones incrementally.
+STREAM_THRESHOLD = 256 * 1024
+READ_SIZE = 64 * 1024
+# ijson prefix of the client ids of a method request.
+CLIENT_IDS_PREFIX = "arguments.client_ids"
+
+_VALUE_EVENTS = frozenset(
+    ("start_map", "start_array", "string", "number", "boolean", "null")
+)
+
+
+class LimitedReader:
+    """File-like view of the next length bytes of a stream.
+
+    Keeps an incremental parser from reading into the next request of a
+    keep-alive connection.
+    """
+
+    def __init__(self, stream: Any, length: int):
+        self.stream = stream
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        _data = self.stream.read(size) if size else b""
+        self.remaining -= len(_data)
+        return _data
+
+
+def load_json_stream(
+    stream: Union[BinaryIO, LimitedReader],
+    max_items: int,
+    prefix: str = CLIENT_IDS_PREFIX,
+) -> Any:
+    """Parse one JSON document incrementally.
+
+    Raises PayloadTooLarge as soon as the array at prefix, the method
+    request's client_ids by default, grows past max_items, so it is rejected
+    before the rest is read or built. Other arrays are not limited here.
+    """
+    if ijson is None:
+        raise RuntimeError("ijson is required for streaming JSON parsing.")
+    _builder = ijson.ObjectBuilder()
+    _item_prefix = f"{prefix}.item"
+    _count = 0
+    _events = ijson.parse(stream, buf_size=READ_SIZE, use_float=True)
+    try:
+        for _prefix, _event, _value in _events:
+            if _prefix == _item_prefix and _event in _VALUE_EVENTS:
+                _count += 1
+                if _count > max_items:
+                    raise PayloadTooLarge(
+                        f"Too many clients ids, at most {max_items} allowed."
+                    )
+            elif _prefix == prefix and _event == "start_array":
+                _count = 0
+            _builder.event(_event, _value)
+    except ijson.JSONError as e:
+        raise ValueError(f"Invalid JSON: {e}") from e
+    return _builder.value
@@ -3,6 +3,8 @@ import tarantool
 TARANTOOL_SCORE_SPACE = "scores"
 TARANTOOL_INTERESTS_SPACE = "interests"
 
+# Every step may run again on an existing database: spaces and indexes are
+# created if missing and the sample rows are replaced, not inserted.
 conn = tarantool.Connection(host="127.0.0.1", port=3302)  # type: ignore
 # Create score
 conn.eval(f"box.schema.space.create('{TARANTOOL_SCORE_SPACE}',"
@@ -13,7 +15,7 @@ conn.eval(
     "{ name = 'score', type = 'double' },})"
 )
 conn.eval(f"""box.space.{TARANTOOL_SCORE_SPACE}:create_index('primary',"""
-          """{ parts = { 'key' } })""")
+          """{ parts = { 'key' }, if_not_exists = true })""")
 # Create interests
 conn.eval(f"box.schema.space.create('{TARANTOOL_INTERESTS_SPACE}',"
           "{if_not_exists=true})")
@@ -25,13 +27,26 @@ conn.eval(
 )
 
 conn.eval(f"""box.space.{TARANTOOL_INTERESTS_SPACE}:create_index('primary',"""
-          """{ parts = { 'key' } })""")
+          """{ parts = { 'key' }, if_not_exists = true })""")
 
-conn.eval(f"""box.space.{TARANTOOL_INTERESTS_SPACE}:"""
-          """insert{1,{'cars','travel'}}""")
-conn.eval(f"""box.space.{TARANTOOL_INTERESTS_SPACE}:"""
-          """insert{2,{'pets','sport'}}""")
-conn.eval(f"""box.space.{TARANTOOL_INTERESTS_SPACE}:"""
-          """insert{3,{'geek','otus'}}""")
+# Get-or-compute scoring in one round trip, see api.py --score-function.
+# Without yields between get and upsert the lookup is atomic under memtx, the
+# upsert with no operations never overwrites a score stored meanwhile.
+# if_not_exists keeps an existing body, drop the function to change it.
+conn.eval(
+    "box.schema.func.create('api_scoring_score_get_or_set', {"
+    "if_not_exists = true, language = 'LUA', body = [[function(key, score)"
+    f" local space = box.space.{TARANTOOL_SCORE_SPACE}"
+    " local tuple = space:get(key)"
+    " if tuple ~= nil then return tuple[2] end"
+    " space:upsert({key, score}, {})"
+    " return score end]]})"
+)
+conn.eval("box.schema.user.grant('guest', 'execute', 'function',"
+          "'api_scoring_score_get_or_set', {if_not_exists = true})")
+
+# Sample rows, load real data with python -m api_scoring.loader.
+for _row in ((1, ["cars", "travel"]), (2, ["pets", "sport"]), (3, ["geek", "otus"])):
+    conn.replace(TARANTOOL_INTERESTS_SPACE, _row)
 
 conn.close()
@@ -0,0 +1,36 @@
+from benchmarks.load import (
+    drive,
+    local_server,
+    memory_store,
+    online_score_bodies,
+    percentile,
+    run_load,
+)
+from benchmarks.micro import run_micro
+
+
+def test_percentile() -> None:
+    _values = [float(i) for i in range(101)]
+    assert percentile(_values, 0.5) == 50.0
+    assert percentile(_values, 0.99) == 99.0
+    assert percentile([], 0.99) == 0.0
+
+
+def test_micro_benchmarks_run() -> None:
+    _results = run_micro(number=10)
+    assert {"get_key", "get_score_store"} <= {_item["name"] for _item in _results}
+
+
+def test_load_against_stand_in() -> None:
+    _store = memory_store(clients=10)
+    with local_server(2, _store) as _address:
+        _result = drive(_address, online_score_bodies(count=4), 2, 0.2)
+    assert _result["requests"] > 0
+    assert _result["errors"] == 0
+    assert _store.scores
+
+
+def test_load_sweeps_clients_past_workers() -> None:
+    _results = run_load(0.1, concurrency=[3], client_ids_sizes=[1], server_workers=1)
+    assert [_item["server_workers"] for _item in _results] == [1, 1]
+    assert all(_item["errors"] == 0 and _item["requests"] for _item in _results)
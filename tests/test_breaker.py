@@ -0,0 +1,82 @@
+import pytest
+
+from api_scoring.breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+from api_scoring.models import ClientsInterestsRequest, OnlineScoreRequest
+from api_scoring.scoring import configure_caches, get_interests, get_score
+from api_scoring.store import CircuitBreakerStore, MemoryStore
+from tarantool.error import NetworkError
+
+
+def _fail() -> None:
+    raise NetworkError("connection refused")
+
+
+def _call(breaker: CircuitBreaker) -> None:
+    with breaker.guard():
+        _fail()
+
+
+def test_breaker_opens_after_failures() -> None:
+    _breaker = CircuitBreaker("test-open", failure_threshold=2, reset_timeout=60)
+    for _ in range(2):
+        with pytest.raises(NetworkError):
+            _call(_breaker)
+    assert _breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        _call(_breaker)
+
+
+def test_breaker_half_open_probe() -> None:
+    _breaker = CircuitBreaker("test-probe", failure_threshold=1, reset_timeout=0)
+    with pytest.raises(NetworkError):
+        _call(_breaker)
+    assert _breaker.state == OPEN
+    with pytest.raises(NetworkError):
+        _call(_breaker)
+    assert _breaker.state == OPEN
+    with _breaker.guard():
+        assert _breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            with _breaker.guard():
+                pass
+    assert _breaker.state == CLOSED
+
+
+class DownStore(MemoryStore):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+
+    def cache_get(self, key: str) -> None:
+        self.calls += 1
+        raise NetworkError("connection refused")
+
+    def get_interests_many(self, keys: list, batch_size: int = 0) -> dict:
+        self.calls += 1
+        raise NetworkError("connection refused")
+
+
+def test_open_breaker_skips_store() -> None:
+    configure_caches(score_size=0, interests_size=0)
+    _backend = DownStore()
+    _store = CircuitBreakerStore(
+        _backend, CircuitBreaker("test-store", failure_threshold=1, reset_timeout=60)
+    )
+    _request = OnlineScoreRequest(
+        {"phone": "79175002040", "email": "a@b.ru", "birthday": "01.01.1990"}
+    )
+    try:
+        assert get_score(_request, _store) == 3.0
+        assert get_score(_request, _store) == 3.0
+        _interests = ClientsInterestsRequest({"client_ids": [1, 2]})
+        assert get_interests(_interests, _store)[1] == 500
+    finally:
+        configure_caches()
+    assert _backend.calls == 1
+    assert _backend.scores == {}
@@ -0,0 +1,90 @@
+import io
+import json
+
+import pytest
+
+from api_scoring import bulk
+from api_scoring.bulk import compute_scores, score_chunk, score_file
+from api_scoring.models import OnlineScoreRequest
+from api_scoring.scoring import compute_score, get_key
+from api_scoring.store import MemoryStore
+
+ROWS = [
+    {"phone": "79175002040", "email": "stupnikov@otus.ru"},
+    {"first_name": "a", "last_name": "b"},
+    {"gender": 1, "birthday": "01.01.2000", "first_name": "a"},
+    {"gender": 0, "birthday": "01.01.2000", "first_name": "a", "last_name": "b"},
+    {
+        "phone": 79175002040,
+        "email": "stupnikov@otus.ru",
+        "first_name": "Stanislav",
+        "last_name": "Stupnikov",
+        "birthday": "01.01.1990",
+        "gender": 1,
+    },
+]
+
+
+def _lines(rows: list) -> bytes:
+    return b"".join(json.dumps(_row).encode("utf-8") + b"\n" for _row in rows)
+
+
+def test_chunk_matches_compute_score() -> None:
+    _rows, _errors = score_chunk(
+        [(i, json.dumps(_row).encode("utf-8")) for i, _row in enumerate(ROWS, 1)]
+    )
+    _requests = [OnlineScoreRequest(_row) for _row in ROWS]
+    assert _errors == []
+    assert _rows == [(get_key(_r), compute_score(_r)) for _r in _requests]
+
+
+def test_chunk_reports_invalid_lines() -> None:
+    _rows, _errors = score_chunk(
+        [
+            (1, b"{"),
+            (2, b"[]"),
+            (3, b'{"email": "bad"}'),
+            (4, b'{"gender": 1}'),
+            (5, b'{"arguments": [1]}'),
+        ]
+    )
+    assert _rows == []
+    assert [_number for _number, _ in _errors] == [1, 2, 3, 4, 5]
+    assert _errors[3][1] == bulk.INVALID_ARGUMENTS
+    assert _errors[4][1] == "Arguments must be a JSON object."
+
+
+def test_pure_python_scores(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(bulk, "numpy", None)
+    assert compute_scores(
+        ([True, False], [True, False], [False, True], [True, True])
+    ) == [
+        3.5,
+        2.0,
+    ]
+
+
+@pytest.mark.skipif(bulk.numpy is None, reason="numpy is not installed")
+def test_numpy_scores() -> None:
+    assert compute_scores(
+        ([True, False], [True, False], [False, True], [True, True])
+    ) == [
+        3.5,
+        2.0,
+    ]
+
+
+@pytest.mark.parametrize("_workers", [1, 2])
+def test_score_file_loads_store(_workers: int) -> None:
+    _store = MemoryStore()
+    _output = io.BytesIO()
+    _source = io.BytesIO(_lines(ROWS * 3) + b"\nnot json\n")
+    _stats = score_file(_source, _output, _store, chunk_size=4, workers=_workers)
+    assert _stats == {"scored": 15, "errors": 1}
+    _results = [json.loads(_line) for _line in _output.getvalue().splitlines()]
+    assert [_item["key"] for _item in _results[:5]] == [
+        get_key(OnlineScoreRequest(_row)) for _row in ROWS
+    ]
+    assert _results[-1]["line"] == 17
+    assert "error" in _results[-1]
+    assert len(_store.scores) == 5
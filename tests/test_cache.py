@@ -0,0 +1,40 @@
+from api_scoring.cache import MISSING, LRUCache
+
+
+def test_cache_hit_and_miss() -> None:
+    _cache = LRUCache(maxsize=2, ttl=60)
+    _cache.set("uid:1", 5.0)
+    assert _cache.get("uid:1") == 5.0
+    assert _cache.get("uid:2") is MISSING
+    assert _cache.stats()["hits"] == 1
+    assert _cache.stats()["misses"] == 1
+
+
+def test_cache_keeps_none_values() -> None:
+    _cache = LRUCache(maxsize=2, ttl=60)
+    _cache.set(1, None)
+    assert _cache.get(1, default="missing") is None
+    assert _cache.get_many([1, 2]) == {1: None}
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    _cache = LRUCache(maxsize=2, ttl=60)
+    _cache.set_many([(1, "a"), (2, "b")])
+    _cache.get(1)
+    _cache.set(3, "c")
+    assert _cache.get_many([1, 2, 3]) == {1: "a", 3: "c"}
+    assert _cache.stats()["evictions"] == 1
+
+
+def test_cache_expires_entries() -> None:
+    _cache = LRUCache(maxsize=2, ttl=-1)
+    _cache.set(1, "a")
+    assert _cache.get(1) is MISSING
+    assert _cache.stats()["expirations"] == 1
+    assert len(_cache) == 0
+
+
+def test_cache_disabled() -> None:
+    _cache = LRUCache(maxsize=0, ttl=60)
+    _cache.set(1, "a")
+    assert _cache.get(1) is MISSING
@@ -0,0 +1,91 @@
+import io
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+from api_scoring.loader import (
+    CSV,
+    JSONL,
+    load_file,
+    load_tuples,
+    parse_record,
+    read_tuples,
+)
+from api_scoring.score import TARANTOOL_INTERESTS_SPACE, TARANTOOL_SCORE_SPACE
+from api_scoring.store import HashRing
+
+
+class FakeSpacePool:
+    """Pool whose connections replace tuples into a shared dict."""
+
+    def __init__(self) -> None:
+        self.rows: Dict[Any, List[Any]] = {}
+        self.batches = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self) -> Iterator["FakeSpacePool"]:
+        yield self
+
+    def eval(self, lua: str, space: str, tuples: List[List[Any]]) -> None:
+        with self._lock:
+            self.batches += 1
+            for _tuple in tuples:
+                self.rows[_tuple[0]] = _tuple
+
+
+def test_parse_records() -> None:
+    assert parse_record(TARANTOOL_SCORE_SPACE, b'{"key": "uid:1", "score": 3}') == [
+        "uid:1",
+        3.0,
+    ]
+    assert parse_record(TARANTOOL_SCORE_SPACE, ["uid:1", "1.5"]) == ["uid:1", 1.5]
+    assert parse_record(
+        TARANTOOL_INTERESTS_SPACE, b'{"client_id": 7, "interests": ["cars"]}'
+    ) == [7, ["cars"]]
+    assert parse_record(TARANTOOL_INTERESTS_SPACE, ["7", "cars|pets"]) == [
+        7,
+        ["cars", "pets"],
+    ]
+    for _record in (b"[1, 2]", b'{"key": "uid:1"}', ["x", "cars"]):
+        with pytest.raises((KeyError, ValueError)):
+            parse_record(TARANTOOL_INTERESTS_SPACE, _record)
+
+
+def test_csv_header_and_invalid_rows_are_skipped() -> None:
+    _source = io.BytesIO(b"client_id,interests\n1,cars|pets\nnope,cars\n\n2,\n")
+    _stats = {"errors": 0}
+    _tuples = list(read_tuples(_source, TARANTOOL_INTERESTS_SPACE, CSV, _stats))
+    assert _tuples == [[1, ["cars", "pets"]], [2, []]]
+    assert _stats["errors"] == 1
+
+
+def test_load_is_idempotent() -> None:
+    _lines = b"".join(b'{"key": "uid:%d", "score": %d}\n' % (i, i) for i in range(1000))
+    _pool = FakeSpacePool()
+    for _ in range(2):
+        _stats = load_file(
+            io.BytesIO(_lines + b"{\n"),
+            TARANTOOL_SCORE_SPACE,
+            JSONL,
+            [_pool],  # type: ignore
+            batch_size=64,
+            workers=3,
+        )
+        assert _stats["rows"] == 1000
+        assert _stats["errors"] == 1
+    assert len(_pool.rows) == 1000
+    assert _pool.rows["uid:7"] == ["uid:7", 7.0]
+    assert _pool.batches == 2 * 16
+
+
+def test_load_splits_by_shard() -> None:
+    _pools = [FakeSpacePool(), FakeSpacePool()]
+    _tuples = [[i, ["cars"]] for i in range(200)]
+    load_tuples(_tuples, TARANTOOL_INTERESTS_SPACE, _pools, batch_size=50)  # type: ignore
+    _ring = HashRing(2)
+    for i in range(200):
+        assert i in _pools[_ring.node(i)].rows
+    assert sum(len(_pool.rows) for _pool in _pools) == 200
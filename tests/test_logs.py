@@ -0,0 +1,36 @@
+import json
+import logging
+import queue
+
+import pytest
+
+from api_scoring import logs
+
+
+def test_json_formatter_merges_dict_messages() -> None:
+    _record = logging.makeLogRecord(
+        {"name": "api_scoring.access", "levelname": "INFO", "msg": {"code": 200}}
+    )
+    _line = json.loads(logs.JsonFormatter().format(_record))
+    assert _line["code"] == 200
+    assert _line["logger"] == "api_scoring.access"
+    assert "message" not in _line
+
+
+def test_queue_handler_snapshots_dict_messages() -> None:
+    _queue: queue.SimpleQueue = queue.SimpleQueue()
+    _context = {"request_id": "1"}
+    logs._QueueHandler(_queue).handle(
+        logging.makeLogRecord({"msg": _context, "levelno": logging.INFO})
+    )
+    _context["code"] = 200
+    assert _queue.get_nowait().msg == {"request_id": "1"}
+
+
+@pytest.mark.parametrize("_rate,_sampled", [(1.0, True), (0.0, False)])
+def test_access_sampled(
+    monkeypatch: pytest.MonkeyPatch, _rate: float, _sampled: bool
+) -> None:
+    monkeypatch.setattr(logs, "_access_sample_rate", _rate)
+    monkeypatch.setattr(logs.access_log, "isEnabledFor", lambda level: True)
+    assert logs.access_sampled() is _sampled
@@ -1,7 +1,28 @@
+import asyncio
+import datetime
+import hashlib
+import http.client
+import json
+import threading
+import time
+from typing import Any
+
 import pytest
 
-from api_scoring.api import FORBIDDEN, OK, get_token, method_handler
+from api_scoring import scoring
+from api_scoring.api import (
+    BAD_REQUEST,
+    FORBIDDEN,
+    OK,
+    MainHTTPHandler,
+    batch_handler,
+    check_auth,
+    get_token,
+    method_handler,
+    method_handler_async,
+)
 from api_scoring.models import MethodRequest
+from api_scoring.server import ThreadPoolHTTPServer, make_server
 from unittest.mock import Mock
 
 
@@ -114,3 +135,191 @@ def test_clients_interests(_request: dict, _code: int, _returns: list) -> None:
 def test_wrong_autentification(_request: dict, _code: int) -> None:
     _, code = method_handler(_request, dict(), "")
     assert code == _code
+
+
+def test_admin_online_score_async() -> None:
+    _request = {
+        "body": {
+            "account": "horns&hoofs",
+            "login": "admin",
+            "method": "online_score",
+            "token": "",
+            "arguments": {"phone": "79175002040", "email": "stupnikov@otus.ru"},
+        }
+    }
+    _request["body"]["token"] = get_token(MethodRequest(_request["body"]))
+    _exp, _cod = asyncio.run(method_handler_async(_request, dict(), ""))
+    assert _cod == OK
+    assert _exp == {"score": 42}
+
+
+def test_admin_token_matches_current_hour() -> None:
+    _request = MethodRequest(
+        {"login": "admin", "token": "", "arguments": {}, "method": "online_score"}
+    )
+    _expected = hashlib.sha512(
+        (datetime.datetime.now().strftime("%Y%m%d%H") + "42").encode("utf-8")
+    ).hexdigest()
+    assert get_token(_request) == _expected
+
+
+@pytest.mark.parametrize(
+    "_token,_valid",
+    [
+        pytest.param(None, True, id="valid"),
+        pytest.param("", False, id="empty"),
+        pytest.param("ключ", False, id="non_ascii"),
+    ],
+)
+def test_check_auth(_token: str, _valid: bool) -> None:
+    _attrs = {
+        "account": "horns&hoofs",
+        "login": "h&f",
+        "method": "online_score",
+        "token": "",
+        "arguments": {},
+    }
+    if _token is None:
+        _token = get_token(MethodRequest(_attrs))
+    _attrs["token"] = _token
+    assert check_auth(MethodRequest(_attrs)) is _valid
+
+
+def test_batch_handler_returns_per_item_results() -> None:
+    _arguments = {
+        "phone": "79175002040",
+        "email": "stupnikov@otus.ru",
+        "first_name": "Stanislav",
+        "last_name": "Stupnikov",
+        "birthday": "01.01.1990",
+        "gender": 1,
+    }
+    _items: list = [
+        {"login": "admin", "method": "online_score", "arguments": _arguments},
+        {"login": "h&f", "method": "online_score", "arguments": _arguments},
+        {"login": "h&f", "method": "online_score", "arguments": {}, "token": "bad"},
+        "not an object",
+    ]
+    for _item in _items[:2]:
+        _item["token"] = get_token(MethodRequest(dict(_item, token="")))
+    _ctx: dict = {}
+    _response, _code = batch_handler({"body": _items}, _ctx, "")
+    assert _code == OK
+    assert _ctx["nitems"] == 4
+    assert _response[0] == {"response": {"score": 42}, "code": OK}
+    assert _response[1] == {"response": {"score": 5.0}, "code": OK}
+    assert _response[2]["code"] == FORBIDDEN
+    assert _response[3]["code"] == BAD_REQUEST
+
+
+def test_batch_handler_requires_list() -> None:
+    _, _code = batch_handler({"body": {"login": "h&f"}}, dict(), "")
+    assert _code == BAD_REQUEST
+
+
+def test_keep_alive_connection(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(MainHTTPHandler, "max_requests", 2)
+    monkeypatch.setattr(MainHTTPHandler, "log_message", lambda *args: None)
+    _body = {"login": "admin", "method": "online_score", "token": ""}
+    _body["arguments"] = {"phone": "79175002040", "email": "stupnikov@otus.ru"}
+    _body["token"] = get_token(MethodRequest(_body))
+    server = ThreadPoolHTTPServer(("localhost", 0), MainHTTPHandler, workers=2)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        _conn = http.client.HTTPConnection("localhost", server.server_address[1])
+        _responses = []
+        for _ in range(2):
+            _conn.request("POST", "/method", json.dumps(_body))
+            _response = _conn.getresponse()
+            _responses.append((_response, _response.read()))
+    finally:
+        server.shutdown()
+        server.server_close()
+    (_first, _first_body), (_second, _) = _responses
+    assert int(_first.getheader("Content-Length")) == len(_first_body)
+    assert not _first.will_close
+    assert _second.will_close
+
+
+def test_single_server_closes_connections(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(MainHTTPHandler, "log_message", lambda *args: None)
+    server = make_server(("localhost", 0), MainHTTPHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _port = server.server_address[1]
+    _first = http.client.HTTPConnection("localhost", _port)
+    _second = http.client.HTTPConnection("localhost", _port, timeout=2)
+    try:
+        _first.request("GET", "/metrics")
+        _response = _first.getresponse()
+        _response.read()
+        assert _response.will_close
+        # The first client keeps its socket open, the second is still served.
+        _second.request("GET", "/metrics")
+        assert _second.getresponse().status == OK
+    finally:
+        _first.close()
+        _second.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_pooled_server_closes_connections_when_queued(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(MainHTTPHandler, "log_message", lambda *args: None)
+    server = ThreadPoolHTTPServer(("localhost", 0), MainHTTPHandler, workers=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _port = server.server_address[1]
+    _first = http.client.HTTPConnection("localhost", _port)
+    _second = http.client.HTTPConnection("localhost", _port, timeout=2)
+    try:
+        _first.request("GET", "/metrics")
+        _response = _first.getresponse()
+        _response.read()
+        assert not _response.will_close
+        # The only worker waits on the first connection, the second queues.
+        _second.request("GET", "/metrics")
+        while not server.has_queued():
+            time.sleep(0.001)
+        _first.request("GET", "/metrics")
+        _response = _first.getresponse()
+        _response.read()
+        assert _response.will_close
+        assert _second.getresponse().status == OK
+    finally:
+        _first.close()
+        _second.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_online_score_and_interests_async(monkeypatch: pytest.MonkeyPatch) -> None:
+    _stored: dict = {}
+
+    async def _cache_get(key: str) -> Any:
+        return [key, _stored[key]] if key in _stored else None
+
+    async def _cache_set(key: str, value: float) -> None:
+        _stored[key] = value
+
+    async def _interests(keys: list, batch_size: int = 0) -> dict:
+        return {key: [key, ["cars"]] for key in keys}
+
+    monkeypatch.setattr(scoring, "cache_get_async", _cache_get)
+    monkeypatch.setattr(scoring, "cache_set_async", _cache_set)
+    monkeypatch.setattr(scoring, "tarantool_get_interests_many_async", _interests)
+    scoring.configure_caches(score_size=0, interests_size=0)
+    _body = {"login": "h&f", "method": "online_score", "token": ""}
+    _body["arguments"] = {"phone": "79175002040", "email": "stupnikov@otus.ru"}
+    _body["token"] = get_token(MethodRequest(_body))
+    try:
+        _response, _code = asyncio.run(method_handler_async({"body": _body}, {}, ""))
+        assert (_response, _code) == ({"score": 3.0}, OK)
+        assert list(_stored.values()) == [3.0]
+
+        _body["method"] = "clients_interests"
+        _body["arguments"] = {"client_ids": [1, 2]}
+        _response, _code = asyncio.run(method_handler_async({"body": _body}, {}, ""))
+        assert (_response, _code) == ({1: [1, ["cars"]], 2: [2, ["cars"]]}, OK)
+    finally:
+        scoring.configure_caches()
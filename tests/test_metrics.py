@@ -0,0 +1,82 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from api_scoring import metrics
+from api_scoring.api import MainHTTPHandler, get_token
+from api_scoring.metrics import Registry
+from api_scoring.models import MethodRequest
+from api_scoring.server import ThreadPoolHTTPServer
+
+
+def test_counter_sums_thread_shards() -> None:
+    _registry = Registry()
+    _counter = _registry.counter("requests_total", "Requests.", path="method")
+
+    def _work() -> None:
+        for _ in range(1000):
+            _counter.inc()
+
+    _threads = [threading.Thread(target=_work) for _ in range(4)]
+    for _thread in _threads:
+        _thread.start()
+    for _thread in _threads:
+        _thread.join()
+    assert 'requests_total{path="method"} 4000' in _registry.render()
+
+
+def test_histogram_buckets_are_cumulative() -> None:
+    _registry = Registry()
+    _histogram = _registry.histogram("stage_seconds", "Stages.", stage="parse")
+    for _value in (0.0001, 0.003, 0.003, 10.0):
+        _histogram.observe(_value)
+    _output = _registry.render()
+    assert "# TYPE stage_seconds histogram" in _output
+    assert 'stage_seconds_bucket{stage="parse",le="0.0005"} 1' in _output
+    assert 'stage_seconds_bucket{stage="parse",le="0.005"} 3' in _output
+    assert 'stage_seconds_bucket{stage="parse",le="5.0"} 3' in _output
+    assert 'stage_seconds_bucket{stage="parse",le="+Inf"} 4' in _output
+    assert 'stage_seconds_count{stage="parse"} 4' in _output
+
+
+def test_timed_decorator_records_calls() -> None:
+    _registry = Registry()
+    _histogram = _registry.histogram("call_seconds", "Calls.")
+
+    @_histogram.timed
+    def _call(value: int) -> int:
+        return value * 2
+
+    assert _call(2) == 4
+    assert "call_seconds_count 1" in _registry.render()
+
+
+def test_metrics_endpoint(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(MainHTTPHandler, "log_message", lambda *args: None)
+    _body = {"login": "admin", "method": "online_score", "token": ""}
+    _body["arguments"] = {"phone": "79175002040", "email": "stupnikov@otus.ru"}
+    _body["token"] = get_token(MethodRequest(_body))
+    server = ThreadPoolHTTPServer(("localhost", 0), MainHTTPHandler, workers=2)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _conn = http.client.HTTPConnection("localhost", server.server_address[1])
+    try:
+        _conn.request("POST", "/method", json.dumps(_body))
+        _conn.getresponse().read()
+        _conn.request("GET", "/metrics")
+        _response = _conn.getresponse()
+        _output = _response.read().decode("utf-8")
+        _conn.request("GET", "/unknown")
+        _missing = _conn.getresponse()
+        _missing.read()
+    finally:
+        _conn.close()
+        server.shutdown()
+        server.server_close()
+    assert _response.status == 200
+    assert _response.getheader("Content-Type") == metrics.CONTENT_TYPE
+    assert 'api_scoring_requests_total{code="200",path="method"}' in _output
+    assert 'api_scoring_stage_seconds_count{stage="auth"}' in _output
+    assert 'api_scoring_cache_hit_ratio{cache="score"}' in _output
+    assert _missing.status == 404
@@ -1,9 +1,20 @@
+import datetime
+import re
+import timeit
+
 import pytest
 
 from api_scoring.models import (
+    ArgumentsField,
+    CharField,
     ClientsInterestsRequest,
     MethodRequest,
     OnlineScoreRequest,
+    PhoneField,
+    Request,
+    is_valid_email,
+    parse_date,
+    today_midnight,
 )
 
 
@@ -30,6 +41,9 @@ def test_clients_interests_request_requered_attributes() -> None:
         {"client_ids": [11, 4, 5], "date": "01.01.20"},
         {"client_ids": "wrong_str", "date": "01.01.2024"},
         {"client_ids": {"wrong_id": 123}, "date": "01.01.2024"},
+        {"client_ids": [[1], {}], "date": "01.01.2024"},
+        {"client_ids": [1, "2"], "date": "01.01.2024"},
+        {"client_ids": [True], "date": "01.01.2024"},
     ],
 )
 def test_clients_interests_request_failed(_attr_dict: dict) -> None:
@@ -295,3 +309,82 @@ def test_method_requests_requered_attributes(_attr_dict: dict, _error: str) -> N
 def test_method_requests_failed(_attr_dict: dict, _error: str) -> None:
     with pytest.raises(ValueError, match=_error):
         MethodRequest(_attr_dict)
+
+
+class LegacyMethodRequest(Request, compiled=False):
+    account = CharField(required=False, nullable=True)
+    login = CharField(required=True, nullable=True)
+    token = CharField(required=True, nullable=True)
+    arguments = ArgumentsField(required=True, nullable=True)
+    method = CharField(required=True, nullable=False)
+
+
+def test_method_request_slots() -> None:
+    _request = MethodRequest(
+        {"login": "h&f", "token": "", "arguments": {}, "method": "online_score"}
+    )
+    assert not hasattr(_request, "__dict__")
+    assert _request.account is None
+    assert _request.login == "h&f"
+
+
+def test_slots_require_compiled_init() -> None:
+    with pytest.raises(TypeError):
+
+        class UncheckedRequest(Request, slots=True, compiled=False):
+            phone = PhoneField(required=False, nullable=True)
+
+    with pytest.raises(TypeError):
+
+        class CustomInitRequest(Request, slots=True):
+            phone = PhoneField(required=False, nullable=True)
+
+            def __init__(self, dict_attr: dict) -> None:
+                self.phone = dict_attr.get("phone")
+
+
+def test_compiled_validation_is_faster() -> None:
+    _attr_dict = {
+        "account": "horns&hoofs",
+        "login": "h&f",
+        "method": "online_score",
+        "token": "d3573aff1555c",
+        "arguments": {},
+    }
+    _legacy = min(
+        timeit.repeat(lambda: LegacyMethodRequest(_attr_dict), number=2000, repeat=5)
+    )
+    _compiled = min(
+        timeit.repeat(lambda: MethodRequest(_attr_dict), number=2000, repeat=5)
+    )
+    assert _compiled < _legacy
+
+
+@pytest.mark.parametrize(
+    "_value",
+    ["01.01.1990", "29.02.2024", "1.1.2020", "29.02.2023", "01.13.2020", "00.01.2020"]
+    + ["01.01.20", "01-01-2020", "01.01.2020 ", "３１.01.2020", 20200101, None],
+)
+def test_parse_date_matches_strptime(_value: object) -> None:
+    try:
+        _expected = datetime.datetime.strptime(_value, "%d.%m.%Y")  # type: ignore
+    except (TypeError, ValueError) as e:
+        with pytest.raises(type(e), match=re.escape(str(e))):
+            parse_date(_value)
+    else:
+        assert parse_date(_value) == _expected
+
+
+def test_today_midnight() -> None:
+    assert today_midnight() == datetime.datetime.combine(
+        datetime.date.today(), datetime.datetime.min.time()
+    )
+
+
+@pytest.mark.parametrize(
+    "_value",
+    ["a@b.c", "stupnikov@otus.ru", "a@b@c.d", "a@.bc", "a@bc.", "@b.c", "a@b..c"]
+    + ["a@b.c@d", "a.b@c", "ab@c.d.e", "a\n@b.c", "ё@почта.рф", "ё@почтарф", ""],
+)
+def test_email_fast_path_matches_regex(_value: str) -> None:
+    assert is_valid_email(_value) == bool(re.match(r"[^@]+@[^@]+\.[^@]+", _value))
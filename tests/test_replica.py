@@ -0,0 +1,95 @@
+import pytest
+
+from api_scoring import metrics
+from api_scoring.models import ClientsInterestsRequest
+from api_scoring.replica import (
+    InterestsReplica,
+    ReplicaStore,
+    build_snapshot,
+    configure_replica,
+)
+from api_scoring.scoring import configure_caches, get_interests
+from api_scoring.store import MemoryStore, ShardedStore
+from tarantool.error import NetworkError
+
+INTERESTS = {1: ["cars", "pets"], 2: [], 3: ["pets", "travel"], 70: ["geek"]}
+
+
+class CountingStore(MemoryStore):
+    def __init__(self) -> None:
+        super().__init__(INTERESTS)
+        self.lookups = 0
+        self.down = False
+
+    def get_interests_many(self, keys: list, batch_size: int = 0) -> dict:
+        self.lookups += 1
+        return super().get_interests_many(keys, batch_size)
+
+    def scan_interests(self, page_size: int = 2):  # type: ignore
+        if self.down:
+            raise NetworkError("connection refused")
+        return super().scan_interests(page_size)
+
+
+def test_snapshot_matches_store() -> None:
+    _store = MemoryStore(INTERESTS)
+    _snapshot = build_snapshot(_store.scan_interests(page_size=3), 0.0)
+    assert len(_snapshot) == 4
+    for key in (1, 2, 3, 70, 4, 0, 100):
+        assert _snapshot.get(key) == _store.get_interests_many([key])[key]
+    # Every occurrence of an interest is one interned string.
+    assert _snapshot.get(1)[1][1] is _snapshot.get(3)[1][0]
+
+
+def test_snapshot_of_shards_is_sorted() -> None:
+    _shards = ShardedStore([MemoryStore(), MemoryStore()])
+    for key, value in INTERESTS.items():
+        _shards.shard(key).set_interests([(key, value)])
+    _snapshot = build_snapshot(_shards.scan_interests(page_size=1), 0.0)
+    assert list(_snapshot.ids) == sorted(INTERESTS)
+    assert _snapshot.get(70) == (70, ["geek"])
+
+
+def test_replica_serves_interests() -> None:
+    configure_caches(interests_size=0)
+    _backend = CountingStore()
+    _replica = InterestsReplica(_backend, refresh_interval=60, max_staleness=60)
+    _replica.load()
+    _store = ReplicaStore(_backend, _replica)
+    try:
+        _response, _code = get_interests(
+            ClientsInterestsRequest({"client_ids": [3, 1, 5]}), _store
+        )
+        assert _code == 200
+        assert _response == {3: (3, INTERESTS[3]), 1: (1, INTERESTS[1]), 5: None}
+        assert _backend.lookups == 0
+
+        _replica.max_staleness = 0
+        get_interests(ClientsInterestsRequest({"client_ids": [3]}), _store)
+        assert _backend.lookups == 1
+    finally:
+        _store.close()
+        configure_caches()
+
+
+def test_failed_refresh_keeps_snapshot() -> None:
+    _backend = CountingStore()
+    _replica = InterestsReplica(_backend, refresh_interval=60, max_staleness=60)
+    _replica.refresh()
+    _backend.down = True
+    _replica.refresh()
+    assert _replica.snapshot is not None
+    assert _replica.snapshot.get(70) == (70, ["geek"])
+    with pytest.raises(ValueError):
+        InterestsReplica(_backend, refresh_interval=60, max_staleness=1)
+
+
+def test_configured_replica_is_reported() -> None:
+    _replica = InterestsReplica(CountingStore(), refresh_interval=60, max_staleness=60)
+    _replica.load()
+    assert "api_scoring_replica_clients 4" not in metrics.registry.render()
+    configure_replica(_replica)
+    try:
+        assert "api_scoring_replica_clients 4" in metrics.registry.render()
+    finally:
+        configure_replica(None)
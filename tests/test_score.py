@@ -0,0 +1,108 @@
+import os
+
+import pytest
+from tarantool.error import NetworkError
+
+from api_scoring import score
+from api_scoring.score import ConnectionPool, PoolTimeoutError
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.closed = False
+
+    def is_closed(self) -> bool:
+        return self.closed
+
+    def ping(self, notime: bool = False) -> str:
+        return "Success"
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def pool(monkeypatch: pytest.MonkeyPatch) -> ConnectionPool:
+    _pool = ConnectionPool(size=2, timeout=0.05)
+    monkeypatch.setattr(_pool, "_connect", FakeConnection)
+    return _pool
+
+
+def test_pool_reuses_connections(pool: ConnectionPool) -> None:
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+    assert first is second
+
+
+def test_pool_is_bounded(pool: ConnectionPool) -> None:
+    first, second = pool.acquire(), pool.acquire()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    pool.release(second)
+
+
+def test_pool_drops_broken_connections(pool: ConnectionPool) -> None:
+    with pytest.raises(NetworkError):
+        with pool.connection() as broken:
+            raise NetworkError("connection lost")
+    assert broken.closed
+    with pool.connection() as conn:
+        assert conn is not broken
+
+
+def test_pool_evicts_idle_connections(pool: ConnectionPool) -> None:
+    pool.idle_timeout = -1.0
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+    assert first.closed
+    assert first is not second
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_child_opens_own_connection(pool: ConnectionPool) -> None:
+    with pool.connection() as inherited:
+        pass
+    _read, _write = os.pipe()
+    _pid = os.fork()
+    if _pid == 0:
+        try:
+            with pool.connection() as conn:
+                _own = conn is not inherited and inherited.closed
+            os.write(_write, b"1" if _own else b"0")
+        finally:
+            os._exit(0)
+    os.close(_write)
+    _result = os.read(_read, 1)
+    os.close(_read)
+    os.waitpid(_pid, 0)
+    assert _result == b"1"
+    with pool.connection() as conn:
+        assert conn is inherited and not conn.closed
+
+
+class FakeInterestsConnection(FakeConnection):
+    data = {1: [1, ["cars", "travel"]], 2: [2, ["pets", "sport"]]}
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.batches: list = []
+
+    def eval(self, expr: str, space: str, keys: list) -> list:
+        self.batches.append(keys)
+        return [[self.data.get(key) for key in keys]]
+
+
+def test_interests_many_batches_lookups(monkeypatch: pytest.MonkeyPatch) -> None:
+    _pool = ConnectionPool(size=1)
+    _conn = FakeInterestsConnection()
+    monkeypatch.setattr(_pool, "_connect", lambda: _conn)
+    monkeypatch.setattr(score, "get_pool", lambda: _pool)
+    _result = score.tarantool_get_interests_many([1, 2, 3, 1], batch_size=2)
+    assert _result == {1: [1, ["cars", "travel"]], 2: [2, ["pets", "sport"]], 3: None}
+    assert _conn.batches == [[1, 2], [3]]
@@ -0,0 +1,38 @@
+from typing import Iterator
+
+import pytest
+
+from api_scoring import serializers
+
+
+@pytest.fixture(params=serializers.JSON_BACKENDS)
+def backend(request: pytest.FixtureRequest) -> Iterator[str]:
+    try:
+        _name = serializers.select_backend(request.param)
+    except ImportError:
+        pytest.skip(f"{request.param} is not installed")
+    yield _name
+    serializers.select_backend()
+
+
+def test_roundtrip(backend: str) -> None:
+    _response = {"response": {1: [1, ["cars", "travel"]], 2: None}, "code": 200}
+    assert serializers.loads(serializers.dumps(_response)) == {
+        "response": {"1": [1, ["cars", "travel"]], "2": None},
+        "code": 200,
+    }
+
+
+def test_loads_bytes(backend: str) -> None:
+    assert serializers.loads('{"login": "ёж"}'.encode("utf-8")) == {"login": "ёж"}
+
+
+def test_big_integers(backend: str) -> None:
+    assert (
+        serializers.dumps([2**70 + 1]).replace(b" ", b"") == b"[1180591620717411303425]"
+    )
+
+
+def test_unknown_backend() -> None:
+    with pytest.raises(ValueError):
+        serializers.select_backend("pickle")
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler
+from typing import Any, List
+
+from api_scoring.server import ThreadPoolHTTPServer
+from api_scoring.server_async import AsyncHTTPServer
+
+
+class EchoThreadHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        _body = threading.current_thread().name.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(_body)))
+        self.end_headers()
+        self.wfile.write(_body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def test_thread_pool_server_serves_requests_on_workers() -> None:
+    server = ThreadPoolHTTPServer(("localhost", 0), EchoThreadHandler, workers=2)
+    _thread = threading.Thread(target=server.serve_forever, daemon=True)
+    _thread.start()
+    try:
+        _url = f"http://localhost:{server.server_address[1]}/"
+        _names = {urllib.request.urlopen(_url).read().decode() for _ in range(4)}
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert all(name.startswith("http-worker") for name in _names)
+
+
+def test_async_server_serves_keep_alive_requests() -> None:
+    async def _route(request: Any, ctx: Any, store: Any) -> tuple:
+        return {"echo": request["body"]["value"]}, 200
+
+    async def _exchange() -> List[Any]:
+        server = AsyncHTTPServer({"method": _route}, lambda r, c: {"response": r})
+        listener = await asyncio.start_server(server.handle_connection, "localhost", 0)
+        _port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("localhost", _port)
+        _bodies = []
+        for _value in (1, 2):
+            _body = json.dumps({"value": _value}).encode()
+            writer.write(
+                b"POST /method HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s"
+                % (len(_body), _body)
+            )
+            _head = await reader.readuntil(b"\r\n\r\n")
+            _length = int(_head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+            _bodies.append(json.loads(await reader.readexactly(_length)))
+        writer.close()
+        listener.close()
+        return _bodies
+
+    assert asyncio.run(_exchange()) == [
+        {"response": {"echo": 1}},
+        {"response": {"echo": 2}},
+    ]
+
+
+def test_async_server_closes_slow_bodies() -> None:
+    async def _route(request: Any, ctx: Any, store: Any) -> tuple:
+        return {}, 200
+
+    async def _exchange() -> bytes:
+        server = AsyncHTTPServer(
+            {"method": _route}, lambda r, c: {"response": r}, keepalive_timeout=0.05
+        )
+        listener = await asyncio.start_server(server.handle_connection, "localhost", 0)
+        _port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("localhost", _port)
+        writer.write(b"POST /method HTTP/1.1\r\nContent-Length: 10\r\n\r\n{}")
+        _received = await asyncio.wait_for(reader.read(), 2)
+        writer.close()
+        listener.close()
+        return _received
+
+    assert asyncio.run(_exchange()) == b""
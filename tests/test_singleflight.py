@@ -0,0 +1,125 @@
+import asyncio
+import threading
+from typing import Any, Dict, List
+
+import pytest
+
+from api_scoring.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def _run_threads(count: int, target: Any) -> List[Any]:
+    _results: List[Any] = [None] * count
+    _barrier = threading.Barrier(count)
+
+    def _worker(i: int) -> None:
+        _barrier.wait()
+        try:
+            _results[i] = target()
+        except Exception as e:
+            _results[i] = e
+
+    _threads = [threading.Thread(target=_worker, args=(i,)) for i in range(count)]
+    for _thread in _threads:
+        _thread.start()
+    for _thread in _threads:
+        _thread.join()
+    return _results
+
+
+def test_concurrent_calls_share_one_execution() -> None:
+    _flight = SingleFlight("test")
+    _calls = []
+    _release = threading.Event()
+
+    def _load() -> float:
+        _calls.append(1)
+        _release.wait(1)
+        return 3.0
+
+    threading.Timer(0.1, _release.set).start()
+    _results = _run_threads(8, lambda: _flight.do("uid:1", _load))
+    assert _results == [3.0] * 8
+    assert len(_calls) == 1
+
+
+def test_errors_reach_every_waiter() -> None:
+    _flight = SingleFlight("test")
+    _release = threading.Event()
+
+    def _load() -> None:
+        _release.wait(1)
+        raise ConnectionError("store is down")
+
+    threading.Timer(0.1, _release.set).start()
+    _results = _run_threads(4, lambda: _flight.do("uid:1", _load))
+    assert all(isinstance(_result, ConnectionError) for _result in _results)
+    assert _flight.do("uid:1", lambda: 1.0) == 1.0
+
+
+def test_do_many_fetches_each_key_once() -> None:
+    _flight = SingleFlight("test")
+    _fetched: List[List[int]] = []
+    _lock = threading.Lock()
+
+    def _fetch(keys: List[int]) -> Dict[int, Any]:
+        with _lock:
+            _fetched.append(keys)
+        threading.Event().wait(0.05)
+        return {key: [key, ["cars"]] for key in keys}
+
+    _results = _run_threads(6, lambda: _flight.do_many([1, 2, 3, 2], _fetch))
+    for _result in _results:
+        assert _result == {key: [key, ["cars"]] for key in (1, 2, 3)}
+    _keys = [key for _keys in _fetched for key in _keys]
+    assert sorted(_keys) == [1, 2, 3]
+
+
+def test_groups_do_not_share() -> None:
+    _flight = SingleFlight("test")
+    assert _flight.do("uid:1", lambda: 1.0, group="a") == 1.0
+    assert _flight.do("uid:1", lambda: 2.0, group="b") == 2.0
+
+
+def test_async_single_flight() -> None:
+    _flight = AsyncSingleFlight("test")
+    _calls: List[Any] = []
+
+    async def _load() -> float:
+        _calls.append(1)
+        await asyncio.sleep(0.01)
+        return 3.0
+
+    async def _fetch(keys: List[int]) -> Dict[int, Any]:
+        _calls.append(keys)
+        await asyncio.sleep(0.01)
+        return {key: key * 10 for key in keys}
+
+    async def _main() -> tuple:
+        _scores = await asyncio.gather(*(_flight.do("uid:1", _load) for _ in range(5)))
+        _interests = await asyncio.gather(
+            _flight.do_many([1, 2], _fetch), _flight.do_many([2, 3], _fetch)
+        )
+        return _scores, _interests
+
+    _scores, _interests = asyncio.run(_main())
+    assert _scores == [3.0] * 5
+    assert _interests == [{1: 10, 2: 20}, {2: 20, 3: 30}]
+    assert _calls == [1, [1, 2], [3]]
+
+
+def test_async_errors_propagate() -> None:
+    _flight = AsyncSingleFlight("test")
+
+    async def _load() -> None:
+        await asyncio.sleep(0.01)
+        raise ConnectionError("store is down")
+
+    async def _main() -> list:
+        return await asyncio.gather(
+            *(_flight.do("uid:1", _load) for _ in range(3)), return_exceptions=True
+        )
+
+    _results = asyncio.run(_main())
+    assert all(isinstance(_result, ConnectionError) for _result in _results)
+    with pytest.raises(ConnectionError):
+        asyncio.run(_flight.do("uid:1", _load))
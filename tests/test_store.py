@@ -0,0 +1,212 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Sequence, Tuple
+
+import pytest
+
+from api_scoring.api import get_token, method_handler
+from api_scoring.models import MethodRequest, OnlineScoreRequest
+from api_scoring.score import SCORE_FUNCTION
+from api_scoring.scoring import configure_caches, get_key, get_score
+from api_scoring.store import (
+    TARANTOOL,
+    HashRing,
+    MemoryStore,
+    ShardedStore,
+    Store,
+    TarantoolStore,
+    WriteBehindStore,
+    build_store,
+)
+from tarantool.error import DatabaseError
+
+
+def test_memory_store_rows() -> None:
+    _store = MemoryStore({1: ["cars", "pets"]})
+    _store.cache_set("uid:1", 3.0)
+    assert _store.cache_get("uid:1") == ("uid:1", 3.0)
+    assert _store.cache_get_many(["uid:1", "uid:2"]) == {
+        "uid:1": ("uid:1", 3.0),
+        "uid:2": None,
+    }
+    assert _store.get_interests_many([1, 2]) == {1: (1, ["cars", "pets"]), 2: None}
+
+
+def test_incomplete_store_fails_early() -> None:
+    class ScoresOnly(Store):
+        def cache_get(self, key: str) -> None:
+            return None
+
+        def cache_set(self, key: str, value: float) -> None:
+            pass
+
+    with pytest.raises(TypeError):
+        ScoresOnly()  # type: ignore
+
+
+def test_hash_ring_moves_few_keys() -> None:
+    _keys = [f"uid:{i}" for i in range(2000)]
+    _before = HashRing(4)
+    _after = HashRing(5)
+    _moved = sum(_before.node(key) != _after.node(key) for key in _keys)
+    assert {_before.node(key) for key in _keys} == {0, 1, 2, 3}
+    assert _moved < len(_keys) * 0.35
+
+
+def test_sharded_store_routes_keys() -> None:
+    _shards = [MemoryStore({i: ["cars"] for i in range(100)}) for _ in range(3)]
+    _store = ShardedStore(_shards)
+    _items = [(f"uid:{i}", float(i)) for i in range(30)]
+    _store.cache_set_many(_items)
+    for key, _ in _items:
+        assert key in _store.shard(key).scores
+        assert sum(key in _shard.scores for _shard in _shards) == 1
+    assert _store.cache_get_many(["uid:3", "uid:99"]) == {
+        "uid:3": ("uid:3", 3.0),
+        "uid:99": None,
+    }
+    assert _store.get_interests_many([5, 500]) == {5: (5, ["cars"]), 500: None}
+
+
+def test_method_handler_uses_store() -> None:
+    configure_caches(score_size=0, interests_size=0)
+    _store = MemoryStore({1: ["cars", "travel"]})
+    _body = {"account": "horns&hoofs", "login": "h&f", "method": "online_score"}
+    _body["arguments"] = {
+        "phone": "79175002040",
+        "email": "stupnikov@otus.ru",
+        "birthday": "01.01.1990",
+        "gender": 1,
+    }
+    _body["token"] = get_token(MethodRequest(dict(_body, token="")))
+    try:
+        _response, _code = method_handler({"body": _body}, {}, _store)
+        assert (_response, _code) == ({"score": 4.5}, 200)
+        assert list(_store.scores.values()) == [4.5]
+
+        _body["method"] = "clients_interests"
+        _body["arguments"] = {"client_ids": [1, 2]}
+        _response, _code = method_handler({"body": _body}, {}, _store)
+        assert (_response, _code) == ({1: (1, ["cars", "travel"]), 2: None}, 200)
+
+        _body["arguments"] = {"client_ids": [[1], {}]}
+        _response, _code = method_handler({"body": _body}, {}, _store)
+        assert _code == 400
+    finally:
+        configure_caches()
+
+
+class RecordingStore(MemoryStore):
+    def __init__(self) -> None:
+        super().__init__()
+        self.batches: list = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def cache_set_many(
+        self, items: Sequence[Tuple[str, float]], batch_size: int = 0
+    ) -> None:
+        self.release.wait(5)
+        self.batches.append(list(items))
+        super().cache_set_many(items)
+
+
+def test_write_behind_coalesces_and_flushes_on_close() -> None:
+    _backend = RecordingStore()
+    _store = WriteBehindStore(_backend, flush_interval=60)
+    _backend.release.clear()
+    _store.cache_set("uid:0", 0.0)
+    _store.cache_set("uid:1", 1.0)
+    _store.cache_set("uid:1", 1.5)
+    _store.cache_set("uid:2", 2.0)
+    assert _store.cache_get("uid:1") == ("uid:1", 1.5)
+    _backend.release.set()
+    _store.close()
+    assert _backend.scores == {"uid:0": 0.0, "uid:1": 1.5, "uid:2": 2.0}
+    _written = [key for _batch in _backend.batches for key, _ in _batch]
+    assert _written.count("uid:1") == 1
+
+
+def test_write_behind_drops_writes_when_full() -> None:
+    _backend = RecordingStore()
+    _backend.release.clear()
+    _store = WriteBehindStore(_backend, max_pending=2, put_timeout=0.01)
+    _store.cache_set("uid:0", 0.0)
+    # Wait until the flusher holds uid:0, then fill the queue.
+    while not _store._flushing:
+        time.sleep(0.001)
+    _store.cache_set_many([("uid:1", 1.0), ("uid:2", 2.0), ("uid:3", 3.0)])
+    _backend.release.set()
+    _store.close()
+    assert set(_backend.scores) == {"uid:0", "uid:1", "uid:2"}
+
+
+class BrokenSpaceStore(RecordingStore):
+    def __init__(self) -> None:
+        super().__init__()
+        self.failures = 1
+
+    def cache_set_many(
+        self, items: Sequence[Tuple[str, float]], batch_size: int = 0
+    ) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise DatabaseError("Space 'scores' does not exist")
+        super().cache_set_many(items, batch_size)
+
+
+def test_write_behind_survives_backend_errors() -> None:
+    _backend = BrokenSpaceStore()
+    _store = WriteBehindStore(_backend, flush_interval=0.001)
+    _store.cache_set("uid:0", 0.0)
+    while _backend.failures:
+        time.sleep(0.001)
+    _store.cache_set("uid:1", 1.0)
+    while "uid:1" not in _backend.scores:
+        time.sleep(0.001)
+    assert _store._thread is not None and _store._thread.is_alive()
+    _store.close()
+    assert _backend.scores == {"uid:1": 1.0}
+
+
+class FunctionConnection:
+    """Connection running the score stored function against a dict."""
+
+    def __init__(self) -> None:
+        self.scores: dict = {"uid:1": 1.5}
+        self.calls: list = []
+
+    @contextmanager
+    def connection(self) -> Iterator["FunctionConnection"]:
+        yield self
+
+    def call(self, name: str, args: tuple) -> list:
+        self.calls.append((name, args))
+        key, value = args
+        return [self.scores.setdefault(key, value)]
+
+
+def test_score_function_is_one_round_trip() -> None:
+    _pool = FunctionConnection()
+    _store = TarantoolStore(_pool, score_function=True)  # type: ignore
+    assert _store.cache_get_or_set("uid:1", 3.0) == 1.5
+    assert _store.cache_get_or_set("uid:2", 3.0) == 3.0
+    assert _pool.calls == [
+        (SCORE_FUNCTION, ("uid:1", 3.0)),
+        (SCORE_FUNCTION, ("uid:2", 3.0)),
+    ]
+    assert _pool.scores["uid:2"] == 3.0
+    assert not isinstance(build_store(TARANTOOL, score_function=True), WriteBehindStore)
+
+
+def test_get_score_uses_get_or_set() -> None:
+    configure_caches(score_size=0)
+    _store = RecordingStore()
+    _request = OnlineScoreRequest({"phone": "79175002040", "email": "a@b.ru"})
+    try:
+        assert get_score(_request, _store) == 3.0
+        _store.scores[get_key(_request)] = 1.0
+        assert get_score(_request, _store) == 1.0
+    finally:
+        configure_caches()
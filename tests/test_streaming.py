@@ -0,0 +1,179 @@
+import http.client
+import io
+import json
+import threading
+from typing import Iterator
+
+import pytest
+
+from api_scoring import streaming
+from api_scoring.api import (
+    REQUEST_ENTITY_TOO_LARGE,
+    MainHTTPHandler,
+    get_token,
+    method_handler,
+)
+from api_scoring.models import (
+    ADMIN_LOGIN,
+    ClientsInterestsRequest,
+    MethodRequest,
+    PayloadTooLarge,
+    configure_limits,
+)
+from api_scoring.score import INTERESTS_BATCH_SIZE
+from api_scoring.scoring import configure_caches, configure_interests
+from api_scoring.server import ThreadPoolHTTPServer
+from api_scoring.store import MemoryStore
+from tarantool.error import NetworkError
+
+needs_ijson = pytest.mark.skipif(streaming.ijson is None, reason="ijson not installed")
+
+
+def _interests_body(client_ids: list) -> dict:
+    _body = {"login": ADMIN_LOGIN, "method": "clients_interests", "token": ""}
+    _body["arguments"] = {"client_ids": client_ids}
+    _body["token"] = get_token(MethodRequest(_body))
+    return _body
+
+
+def test_limited_reader_stops_at_length() -> None:
+    _reader = streaming.LimitedReader(io.BytesIO(b"{}next request"), 2)
+    assert _reader.read(64) == b"{}"
+    assert _reader.read() == b""
+    assert _reader.remaining == 0
+
+
+def test_client_ids_limit() -> None:
+    configure_limits(3)
+    try:
+        with pytest.raises(PayloadTooLarge):
+            ClientsInterestsRequest({"client_ids": [1, 2, 3, 4]})
+        _response, _code = method_handler(
+            {"body": _interests_body([1, 2, 3, 4])}, {}, MemoryStore()
+        )
+    finally:
+        configure_limits()
+    assert _code == REQUEST_ENTITY_TOO_LARGE
+    assert "at most 3" in _response
+
+
+@needs_ijson
+def test_load_json_stream() -> None:
+    _body = _interests_body(list(range(100)))
+    _stream = io.BytesIO(json.dumps(_body).encode())
+    assert streaming.load_json_stream(_stream, 100) == _body
+    _stream.seek(0)
+    with pytest.raises(PayloadTooLarge):
+        streaming.load_json_stream(_stream, 99)
+    with pytest.raises(ValueError):
+        streaming.load_json_stream(io.BytesIO(b'{"client_ids": [1,'), 10)
+    # Only the method request's client_ids are limited, not a /batch array.
+    _batch = [_interests_body([1, 2])] * 5
+    _stream = io.BytesIO(json.dumps(_batch).encode())
+    assert streaming.load_json_stream(_stream, 2) == _batch
+
+
+def _post(body: bytes, headers: dict) -> list:
+    server = ThreadPoolHTTPServer(("localhost", 0), MainHTTPHandler, workers=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        _conn = http.client.HTTPConnection("localhost", server.server_address[1])
+        _conn.putrequest("POST", "/method")
+        for _name, _value in headers.items():
+            _conn.putheader(_name, _value)
+        _conn.endheaders()
+        try:
+            _conn.send(body)
+        except ConnectionError:
+            pass
+        _response = _conn.getresponse()
+        _payload = json.loads(_response.read())
+        _conn.close()
+        return [_response, _payload]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_body_over_limit_is_refused(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(MainHTTPHandler, "max_body_size", 1024)
+    monkeypatch.setattr(MainHTTPHandler, "log_message", lambda *args: None)
+    _response, _payload = _post(b"", {"Content-Length": "4096"})
+    assert _response.status == REQUEST_ENTITY_TOO_LARGE
+    assert _response.will_close
+    assert _payload["code"] == REQUEST_ENTITY_TOO_LARGE
+
+
+@needs_ijson
+def test_large_body_is_streamed(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(MainHTTPHandler, "log_message", lambda *args: None)
+    monkeypatch.setattr(MainHTTPHandler, "store", MemoryStore())
+    monkeypatch.setattr(streaming, "STREAM_THRESHOLD", 0)
+    monkeypatch.setattr("api_scoring.api.STREAM_THRESHOLD", 0)
+    _body = json.dumps(_interests_body([1, 2, 3])).encode()
+    _response, _payload = _post(_body, {"Content-Length": str(len(_body))})
+    assert _payload["code"] == 200
+    assert sorted(_payload["response"]) == ["1", "2", "3"]
+
+    configure_limits(2)
+    try:
+        _response, _payload = _post(_body, {"Content-Length": str(len(_body))})
+    finally:
+        configure_limits()
+    assert _response.status == REQUEST_ENTITY_TOO_LARGE
+    assert "at most 2" in _payload["error"]
+
+
+class FlakyStore(MemoryStore):
+    def __init__(self, fail_after: int) -> None:
+        super().__init__({i: [f"hobby{i}"] for i in range(10)})
+        self.fail_after = fail_after
+
+    def get_interests_many(self, keys: list, batch_size: int = 0) -> dict:
+        if self.fail_after == 0:
+            raise NetworkError("connection refused")
+        self.fail_after -= 1
+        return super().get_interests_many(keys, batch_size)
+
+
+def _stream_server(monkeypatch: pytest.MonkeyPatch, store: MemoryStore) -> None:
+    monkeypatch.setattr(MainHTTPHandler, "log_message", lambda *args: None)
+    monkeypatch.setattr(MainHTTPHandler, "store", store)
+    monkeypatch.setattr(MainHTTPHandler, "stream_min_clients", 1)
+    configure_caches(score_size=0, interests_size=0)
+    configure_interests(2)
+
+
+@pytest.fixture(autouse=True)
+def _restore_settings() -> Iterator[None]:
+    yield
+    configure_caches()
+    configure_interests(INTERESTS_BATCH_SIZE)
+
+
+def test_interests_are_streamed(monkeypatch: pytest.MonkeyPatch) -> None:
+    _stream_server(monkeypatch, FlakyStore(fail_after=-1))
+    _body = json.dumps(_interests_body([3, 1, 4, 1, 5, 42])).encode()
+    _response, _payload = _post(_body, {"Content-Length": str(len(_body))})
+    assert _response.getheader("Transfer-Encoding") == "chunked"
+    assert _payload == {
+        "response": {
+            "3": [3, ["hobby3"]],
+            "1": [1, ["hobby1"]],
+            "4": [4, ["hobby4"]],
+            "5": [5, ["hobby5"]],
+            "42": None,
+        },
+        "code": 200,
+    }
+
+
+def test_streamed_store_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    _stream_server(monkeypatch, FlakyStore(fail_after=0))
+    _body = json.dumps(_interests_body([1, 2, 3])).encode()
+    _response, _payload = _post(_body, {"Content-Length": str(len(_body))})
+    assert _payload["code"] == 500
+
+    MainHTTPHandler.store = FlakyStore(fail_after=1)
+    with pytest.raises(http.client.IncompleteRead):
+        _post(_body, {"Content-Length": str(len(_body))})